@@ -18,10 +18,15 @@ from .core.bot import MitsuriBot
 from .core.mongo import MongoDB
 from .core.dir import setup_directories
 from .core.git import GitManager
+from .core.cooldowns import cooldowns, MongoCooldownBackend
+from .core.blacklist import blacklist_store
+from .core.phases import PhaseGraph
+from .database.indexes import setup_indexes
+from .core.stats import stats_recorder
 
 # Utils
-from .utils.helpers import load_modules
-from .misc.startup import run_startup_tasks
+from .utils.helpers import run_async
+from .misc.startup import startup_tasks
 
 # Set up logger
 logger = logging.getLogger("Mitsuri")
@@ -44,13 +49,8 @@ class MitsuriContext:
         self.start_time = START_TIME
         self.git = None
         
-        # Bot statistics
-        self.stats = {
-            "messages_processed": 0,
-            "commands_executed": 0,
-            "users_total": 0,
-            "groups_total": 0,
-        }
+        # Bot statistics since this process started; persisted by stats_recorder
+        self.stats = stats_recorder.totals
         
     @property
     def uptime(self) -> str:
@@ -67,62 +67,74 @@ class MitsuriContext:
     
     def increment_stat(self, stat_name: str, increment: int = 1) -> None:
         """Increment a statistics counter"""
-        if stat_name in self.stats:
-            self.stats[stat_name] += increment
+        stats_recorder.incr(stat_name, increment)
 
 # Create global context
 ctx = MitsuriContext()
 
 async def initialize_app() -> None:
-    """Initialize the Mitsuri application"""
+    """
+    Initialize the Mitsuri application.
+    Startup runs as a graph of phases: each starts once the phases it
+    depends on are done, so the MongoDB and Telegram connections are
+    made concurrently and updates are handled as soon as both are up.
+    """
     global db, bot, ctx
     
-    try:
-        # Setup directories
-        logger.info("Mitsuri.core.dir - Setting up directories...")
-        setup_directories()
-        logger.info("Mitsuri.core.dir - Directories Updated.")
-        
-        # Initialize MongoDB
+    db = MongoDB(Config.MONGO_DB_URI)
+    ctx.db = db
+    bot = MitsuriBot(
+        api_id=Config.API_ID,
+        api_hash=Config.API_HASH,
+        bot_token=Config.BOT_TOKEN,
+        mongodb=db,
+        context=ctx
+    )
+    ctx.bot = bot
+    
+    async def directories():
+        await run_async(setup_directories)
+    
+    async def blacklists():
+        await blacklist_store.load_async()
+    
+    async def mongo():
         logger.info("Mitsuri.core.mongo - Connecting to your Mongo Database...")
-        db = MongoDB(Config.MONGO_DB_URI)
         await db.initialize()
-        ctx.db = db
         logger.info("Mitsuri.core.mongo - Connected to your Mongo Database.")
+    
+    async def database_services():
+        # Build missing indexes (including TTL expiry) without holding up startup
+        asyncio.get_event_loop().create_task(setup_indexes(db.get_database()))
         
-        # Initialize Git manager if needed
-        if Config.ENABLE_GIT_UPDATER:
-            logger.info("Mitsuri.core.git - Initializing Git manager...")
-            ctx.git = GitManager()
-            if ctx.git.is_repo():
-                logger.info("Mitsuri.core.git - Git Client Found [VPS DEPLOYER]")
-            else:
-                logger.warning("Mitsuri.core.git - No Git repository found.")
-        
-        # Load database essentials
-        logger.info("Mitsuri.misc - Loading database essentials...")
-        await run_startup_tasks(db)
-        logger.info("Mitsuri.misc - Database loaded ......")
+        # Share command cooldowns between replicas through MongoDB
+        if Config.COOLDOWN_BACKEND == "mongo":
+            cooldowns.use(MongoCooldownBackend(db.get_collection("cooldowns")))
         
-        # Initialize the bot
-        logger.info("Mitsuri.core.bot - Mitsuri Starting...")
-        bot = MitsuriBot(
-            api_id=Config.API_ID,
-            api_hash=Config.API_HASH,
-            bot_token=Config.BOT_TOKEN,
-            mongodb=db,
-            context=ctx
+        # Reload blacklists when the files or the blacklist collection change
+        await blacklist_store.start(
+            db.get_collection("blacklist") if Config.BLACKLIST_MONGO_SYNC else None
         )
-        ctx.bot = bot
-        
-        # Load plugins
-        load_modules(bot)
-        
-        # Start the bot
+    
+    async def git():
+        ctx.git = GitManager()
+        if await run_async(ctx.git.is_repo):
+            logger.info("Mitsuri.core.git - Git Client Found [VPS DEPLOYER]")
+        else:
+            logger.warning("Mitsuri.core.git - No Git repository found.")
+    
+    async def telegram():
+        logger.info("Mitsuri.core.bot - Connecting to Telegram...")
+        await bot.connect_telegram()
+    
+    async def plugins():
+        await startup_tasks(bot)
+    
+    async def updates():
         await bot.start()
         logger.info(f"Mitsuri.core.bot - Bot started successfully as @{bot.me.username}")
-        
-        # Set bot commands
+    
+    async def commands():
         await bot.set_bot_commands([
             ("start", "Start the bot"),
             ("help", "Get help with bot commands"),
@@ -130,26 +142,32 @@ async def initialize_app() -> None:
             ("about", "About this bot"),
             ("ping", "Check bot's ping"),
         ])
-        
-        # Schedule periodic tasks
-        bot.loop.create_task(periodic_tasks())
-        
+    
+    graph = PhaseGraph()
+    graph.add("directories", directories)
+    graph.add("blacklists", blacklists)
+    graph.add("mongo", mongo)
+    graph.add("database_services", database_services, after=["mongo", "blacklists"])
+    if Config.ENABLE_GIT_UPDATER:
+        graph.add("git", git)
+    graph.add("telegram", telegram)
+    graph.add("plugins", plugins)
+    # Handling updates needs the database, the blacklists and every handler registered
+    graph.add("updates", updates, after=["telegram", "plugins", "database_services", "directories"])
+    graph.add("commands", commands, after=["telegram"])
+    
+    try:
+        await graph.run()
     except Exception as e:
         logger.error(f"Error during initialization: {str(e)}", exc_info=True)
         raise
 
-async def periodic_tasks():
-    """Periodic tasks to run in the background"""
-    while True:
-        try:
-            # Update stats in DB every 5 minutes
-            await db.update_stats(ctx.stats)
-            
-            # Clean up expired data
-            await db.cleanup_expired_data()
-            
-            # Wait for next interval
-            await asyncio.sleep(300)  # 5 minutes
-        except Exception as e:
-            logger.error(f"Error in periodic tasks: {str(e)}")
-            await asyncio.sleep(60)  # Retry after 1 minute on error
+async def shutdown_app() -> None:
+    """
+    Stop the bot and close the database connection, saving everything
+    still buffered. Run on exit, also after a failed startup.
+    """
+    if bot is not None:
+        await bot.stop()
+    if db is not None:
+        db.close()
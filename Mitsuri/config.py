@@ -22,6 +22,17 @@ class Config:
     
     # MongoDB
     MONGO_DB_URI: str = os.environ.get("MONGO_DB_URI", "")
+    MONGO_DB_NAME: str = os.environ.get("MONGO_DB_NAME", "mitsuri_db")
+    MONGO_MAX_POOL_SIZE: int = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))  # connections
+    MONGO_MIN_POOL_SIZE: int = int(os.environ.get("MONGO_MIN_POOL_SIZE", 5))  # kept warm
+    WRITE_BEHIND_INTERVAL: float = int(os.environ.get("WRITE_BEHIND_INTERVAL", 500)) / 1000  # ms between flushes
+    WRITE_BEHIND_MAX_OPS: int = int(os.environ.get("WRITE_BEHIND_MAX_OPS", 500))  # pending upserts forcing a flush
+    DB_BATCH_SIZE: int = int(os.environ.get("DB_BATCH_SIZE", 1000))  # documents per page when streaming
+    SEEN_CACHE_SIZE: int = int(os.environ.get("SEEN_CACHE_SIZE", 50000))  # recently written users/groups
+    SEEN_FRESHNESS: int = int(os.environ.get("SEEN_FRESHNESS", 3600))  # in seconds
+    SETTINGS_CACHE_SIZE: int = int(os.environ.get("SETTINGS_CACHE_SIZE", 10000))  # cached settings documents
+    SETTINGS_CACHE_TTL: int = int(os.environ.get("SETTINGS_CACHE_TTL", 300))  # in seconds
+    SETTINGS_NEGATIVE_TTL: int = int(os.environ.get("SETTINGS_NEGATIVE_TTL", 60))  # in seconds, for missing documents
     
     # Bot Owner & Sudo Users
     OWNER_ID: int = int(os.environ.get("OWNER_ID", 0))
@@ -48,18 +59,72 @@ class Config:
     
     # Plugin Settings
     DISABLED_PLUGINS: List[str] = os.environ.get("DISABLED_PLUGINS", "").split()
+    LAZY_PLUGINS: bool = os.environ.get("LAZY_PLUGINS", "True").lower() == "true"  # import plugins on first use
+    PLUGIN_INDEX_FILE: str = os.environ.get("PLUGIN_INDEX_FILE", "data/plugin_index.json")
     
     # Admin Settings
     DELETE_COMMANDS: bool = os.environ.get("DELETE_COMMANDS", "False").lower() == "true"
     COMMAND_PREFIXES: List[str] = list(os.environ.get("COMMAND_PREFIXES", "! / .").split())
     
     # Rate Limiting
-    RATE_LIMIT: int = int(os.environ.get("RATE_LIMIT", 3))  # messages per second
+    RATE_LIMIT: int = int(os.environ.get("RATE_LIMIT", 3))  # messages per window
     RATE_LIMIT_WINDOW: int = int(os.environ.get("RATE_LIMIT_WINDOW", 5))  # in seconds
+    RATE_LIMIT_SCOPE: str = os.environ.get("RATE_LIMIT_SCOPE", "user")  # user, chat or user_chat
+    COOLDOWN_BACKEND: str = os.environ.get("COOLDOWN_BACKEND", "memory")  # memory or mongo (shared by replicas)
+    
+    # Outbound Send Scheduler
+    SENDER_WORKERS: int = int(os.environ.get("SENDER_WORKERS", 8))
+    GLOBAL_SEND_RATE: float = float(os.environ.get("GLOBAL_SEND_RATE", 30))  # messages per second
+    GLOBAL_SEND_BURST: int = int(os.environ.get("GLOBAL_SEND_BURST", 30))
+    PRIVATE_SEND_RATE: float = float(os.environ.get("PRIVATE_SEND_RATE", 1))  # messages per second per chat
+    PRIVATE_SEND_BURST: int = int(os.environ.get("PRIVATE_SEND_BURST", 3))
+    GROUP_SEND_RATE: float = float(os.environ.get("GROUP_SEND_RATE", 20)) / 60  # messages per minute per chat
+    GROUP_SEND_BURST: int = int(os.environ.get("GROUP_SEND_BURST", 3))
+    FLOOD_GLOBAL_CHATS: int = int(os.environ.get("FLOOD_GLOBAL_CHATS", 3))  # distinct chats flooding at once
+    FLOOD_GLOBAL_WINDOW: float = float(os.environ.get("FLOOD_GLOBAL_WINDOW", 1))  # in seconds
+    # Dequeue weights of the interactive, admin and bulk priority classes
+    SEND_PRIORITY_WEIGHTS: List[int] = [
+        int(x) for x in os.environ.get("SEND_PRIORITY_WEIGHTS", "8 3 1").split()
+    ]
+    COALESCE_DELAY: float = float(os.environ.get("COALESCE_DELAY", 0.3))  # in seconds
+    BROADCAST_BATCH_SIZE: int = int(os.environ.get("BROADCAST_BATCH_SIZE", 200))  # recipients fetched and sent concurrently
+    BROADCAST_FLUSH_INTERVAL: float = float(os.environ.get("BROADCAST_FLUSH_INTERVAL", 1))  # in seconds between writes of recipient outcomes
+    BROADCAST_RECORD_DAYS: int = int(os.environ.get("BROADCAST_RECORD_DAYS", 30))  # per-recipient outcomes kept
+    
+    # Statistics
+    STATS_FLUSH_INTERVAL: int = int(os.environ.get("STATS_FLUSH_INTERVAL", 10))  # in seconds
+    STATS_MINUTE_DAYS: int = int(os.environ.get("STATS_MINUTE_DAYS", 2))  # retention of per-minute buckets
+    STATS_HOUR_DAYS: int = int(os.environ.get("STATS_HOUR_DAYS", 90))  # retention of per-hour buckets
+    
+    # Group Analytics
+    ANALYTICS_FLUSH_INTERVAL: int = int(os.environ.get("ANALYTICS_FLUSH_INTERVAL", 30))  # in seconds
+    ANALYTICS_HOURLY_DAYS: int = int(os.environ.get("ANALYTICS_HOURLY_DAYS", 14))  # retention of hourly buckets
+    ANALYTICS_DAILY_DAYS: int = int(os.environ.get("ANALYTICS_DAILY_DAYS", 180))  # retention of daily buckets
+    ANALYTICS_HLL_PRECISION: int = int(os.environ.get("ANALYTICS_HLL_PRECISION", 10))  # 2^p registers, ~3% error at 10
+    ANALYTICS_TOP_COMMANDS: int = int(os.environ.get("ANALYTICS_TOP_COMMANDS", 5))
+    
+    # Logging
+    LOG_BUFFER_SIZE: int = int(os.environ.get("LOG_BUFFER_SIZE", 10000))  # records held for the writer thread
+    LOG_BATCH_SIZE: int = int(os.environ.get("LOG_BATCH_SIZE", 256))  # records per write
+    LOG_FLUSH_INTERVAL: float = float(os.environ.get("LOG_FLUSH_INTERVAL", 0.5))  # in seconds
+    LOG_SAMPLE_EVERY: int = int(os.environ.get("LOG_SAMPLE_EVERY", 10))  # keep 1 in N info records under load
+    
+    # Message Event Archive
+    ARCHIVE_ENABLED: bool = os.environ.get("ARCHIVE_ENABLED", "True").lower() == "true"
+    ARCHIVE_DIR: str = os.environ.get("ARCHIVE_DIR", "data/archive")
+    ARCHIVE_SEGMENT_SIZE: int = int(os.environ.get("ARCHIVE_SEGMENT_SIZE", 16)) * 1024 * 1024  # in bytes
+    ARCHIVE_SEGMENT_AGE: int = int(os.environ.get("ARCHIVE_SEGMENT_AGE", 24)) * 3600  # in seconds
+    ARCHIVE_RETENTION_DAYS: int = int(os.environ.get("ARCHIVE_RETENTION_DAYS", 30))  # 0 keeps everything
+    ARCHIVE_QUEUE_SIZE: int = int(os.environ.get("ARCHIVE_QUEUE_SIZE", 50000))  # events waiting for the disk, later ones are dropped
     
     # Blacklisted Words and Users
+    BLACKLIST_RELOAD_INTERVAL: int = int(os.environ.get("BLACKLIST_RELOAD_INTERVAL", 30))  # in seconds
+    BLACKLIST_MONGO_SYNC: bool = os.environ.get("BLACKLIST_MONGO_SYNC", "False").lower() == "true"
+    BLACKLIST_COMPACT_THRESHOLD: int = int(os.environ.get("BLACKLIST_COMPACT_THRESHOLD", 100000))  # users
+    BLACKLIST_JOURNAL_LIMIT: int = int(os.environ.get("BLACKLIST_JOURNAL_LIMIT", 1000))  # lines before compaction
     BLACKLISTED_WORDS: List[str] = []
-    BLACKLISTED_USERS: List[int] = []
+    BLACKLISTED_USERS: Set[int] = set()  # replaced by the blacklist store's user set on load
+    BLACKLIST_WHOLE_WORDS: bool = os.environ.get("BLACKLIST_WHOLE_WORDS", "False").lower() == "true"
     
     # Auto-generated list of commands (will be populated during startup)
     ALL_COMMANDS: Dict[str, str] = {}
@@ -81,41 +146,56 @@ class Config:
     TWITTER_ACCESS_SECRET: Optional[str] = os.environ.get("TWITTER_ACCESS_SECRET")
     INSTAGRAM_USERNAME: Optional[str] = os.environ.get("INSTAGRAM_USERNAME")
     INSTAGRAM_PASSWORD: Optional[str] = os.environ.get("INSTAGRAM_PASSWORD")
+    INSTAGRAM_ACCESS_TOKEN: Optional[str] = os.environ.get("INSTAGRAM_ACCESS_TOKEN")
+    OPENWEATHER_API_KEY: Optional[str] = os.environ.get("OPENWEATHER_API_KEY")
+    # Keys by service, as the platform integrations look them up
+    API_KEYS: Dict[str, Optional[str]] = {
+        "youtube": YOUTUBE_API_KEY,
+        "twitter": TWITTER_API_KEY,
+        "twitter_secret": TWITTER_API_SECRET,
+        "twitter_access_token": TWITTER_ACCESS_TOKEN,
+        "twitter_access_token_secret": TWITTER_ACCESS_SECRET,
+        "instagram": INSTAGRAM_ACCESS_TOKEN,
+        "openweather": OPENWEATHER_API_KEY,
+    }
+    
+    # Outbound HTTP
+    HTTP_POOL_SIZE: int = int(os.environ.get("HTTP_POOL_SIZE", 100))  # open connections overall
+    HTTP_PER_HOST: int = int(os.environ.get("HTTP_PER_HOST", 10))  # open connections per host
+    HTTP_CONNECT_TIMEOUT: float = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))  # in seconds, includes waiting for a free connection
+    HTTP_READ_TIMEOUT: float = float(os.environ.get("HTTP_READ_TIMEOUT", 15))  # in seconds
+    HTTP_KEEPALIVE: float = float(os.environ.get("HTTP_KEEPALIVE", 30))  # in seconds an idle connection is kept
+    
+    # Platform response cache
+    RESPONSE_CACHE_STORE: str = os.environ.get("RESPONSE_CACHE_STORE", "file").lower()  # file, mongo or none
+    RESPONSE_CACHE_DIR: str = os.environ.get("RESPONSE_CACHE_DIR", "data/cache")
+    RESPONSE_CACHE_SIZE: int = int(os.environ.get("RESPONSE_CACHE_SIZE", 2000))  # entries per API
+    RESPONSE_CACHE_STALE: float = float(os.environ.get("RESPONSE_CACHE_STALE", 7 * 86400))  # in seconds past expiry a response may still be served
+    RESPONSE_CACHE_SAVE_INTERVAL: float = float(os.environ.get("RESPONSE_CACHE_SAVE_INTERVAL", 60))  # in seconds
+    YOUTUBE_SEARCH_TTL: float = float(os.environ.get("YOUTUBE_SEARCH_TTL", 3600))  # in seconds
+    YOUTUBE_VIDEO_TTL: float = float(os.environ.get("YOUTUBE_VIDEO_TTL", 6 * 3600))  # in seconds
+    YOUTUBE_DAILY_QUOTA: int = int(os.environ.get("YOUTUBE_DAILY_QUOTA", 10000))  # in units
+    YOUTUBE_QUOTA_TIMEZONE: str = os.environ.get("YOUTUBE_QUOTA_TIMEZONE", "America/Los_Angeles")  # quota resets at midnight here
 
     @classmethod
     def load_blacklists(cls) -> None:
         """Load blacklisted words and users from files if they exist"""
-        try:
-            if os.path.exists("./data/blacklisted_words.json"):
-                with open("./data/blacklisted_words.json", "r") as f:
-                    cls.BLACKLISTED_WORDS = json.load(f)
-                    
-            if os.path.exists("./data/blacklisted_users.json"):
-                with open("./data/blacklisted_users.json", "r") as f:
-                    cls.BLACKLISTED_USERS = json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading blacklists: {str(e)}")
+        from .core.blacklist import blacklist_store
+        blacklist_store.load()
     
     @classmethod
     def update_blacklisted_words(cls, words: List[str]) -> None:
         """Update blacklisted words and save to file"""
-        cls.BLACKLISTED_WORDS = words
-        os.makedirs("./data", exist_ok=True)
-        with open("./data/blacklisted_words.json", "w") as f:
-            json.dump(words, f)
+        from .core.blacklist import blacklist_store
+        blacklist_store.save_words(words)
     
     @classmethod
     def update_blacklisted_users(cls, users: List[int]) -> None:
-        """Update blacklisted users and save to file"""
-        cls.BLACKLISTED_USERS = users
-        os.makedirs("./data", exist_ok=True)
-        with open("./data/blacklisted_users.json", "w") as f:
-            json.dump(users, f)
+        """Update blacklisted users, journaling only what changed"""
+        from .core.blacklist import blacklist_store
+        blacklist_store.set_users(users)
     
     @classmethod
     def register_command(cls, command: str, description: str) -> None:
         """Register a command and its description"""
         cls.ALL_COMMANDS[command] = description
-
-# Load blacklists at startup
-Config.load_blacklists()
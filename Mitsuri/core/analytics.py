@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from ..config import Config
+from ..database.indexes import IndexSpec, register_index
+from ..utils.hyperloglog import HyperLogLog
+from .mongo import get_database
+
+logger = logging.getLogger("Mitsuri.core.analytics")
+
+COLLECTION = "group_stats"
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+register_index(IndexSpec(
+    COLLECTION, "chat_kind_start",
+    [("chat_id", ASCENDING), ("kind", ASCENDING), ("start", ASCENDING)]
+))
+register_index(IndexSpec(COLLECTION, "expires_at_ttl", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}))
+
+
+class Rollup:
+    """
+    One chat's activity within one hour, not yet written.
+    The sketch holds every user seen this hour; `dirty` the registers
+    raised since the last flush, which are all that needs sending.
+    """
+
+    __slots__ = ("messages", "commands", "moderation", "users", "dirty")
+
+    def __init__(self):
+        self.messages = 0
+        self.commands: Counter = Counter()
+        self.moderation: Counter = Counter()
+        self.users = HyperLogLog(Config.ANALYTICS_HLL_PRECISION)
+        self.dirty: Set[int] = set()
+
+    def is_empty(self) -> bool:
+        return not (self.messages or self.commands or self.moderation or self.dirty)
+
+    def take_deltas(self) -> Tuple[int, Counter, Counter, Dict[str, int]]:
+        """
+        Return and reset what changed since the last flush.
+        :return: (messages, commands, moderation, raised registers)
+        """
+        deltas = (self.messages, self.commands, self.moderation, self.users.sparse(self.dirty))
+        self.messages = 0
+        self.commands = Counter()
+        self.moderation = Counter()
+        self.dirty = set()
+        return deltas
+
+    def restore_deltas(self, deltas: Tuple[int, Counter, Counter, Dict[str, int]]) -> None:
+        messages, commands, moderation, registers = deltas
+        self.messages += messages
+        self.commands.update(commands)
+        self.moderation.update(moderation)
+        self.dirty.update(int(index) for index in registers)
+
+
+class GroupAnalytics:
+    """
+    Per-group activity: messages, distinct active users, commands and
+    moderation actions. Recording only updates an in-memory rollup for
+    the chat and hour; rollups are flushed periodically into hourly and
+    daily bucket documents with $inc for counters and $max for the
+    HyperLogLog registers. Queries read buckets only.
+    """
+
+    def __init__(self, interval: float = 30):
+        """
+        :param interval: Seconds between flushes
+        """
+        self.interval = interval
+        self._rollups: Dict[Tuple[int, datetime], Rollup] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _rollup(self, chat_id: int) -> Rollup:
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        rollup = self._rollups.get((chat_id, hour))
+        if rollup is None:
+            rollup = self._rollups[(chat_id, hour)] = Rollup()
+        return rollup
+
+    def record_message(self, chat_id: int, user_id: int, command: Optional[str] = None) -> None:
+        """
+        Count a group message.
+        :param chat_id: Group ID
+        :param user_id: Sender ID
+        :param command: Command name, if the message is a command
+        """
+        rollup = self._rollup(chat_id)
+        rollup.messages += 1
+        index = rollup.users.add(user_id)
+        if index is not None:
+            rollup.dirty.add(index)
+        if command:
+            rollup.commands[command] += 1
+
+    def record_moderation(self, chat_id: int, action: str) -> None:
+        """
+        Count a moderation action such as ban or mute.
+        """
+        self._rollup(chat_id).moderation[action] += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    @staticmethod
+    def _update(chat_id: int, kind: str, start: datetime, deltas) -> UpdateOne:
+        messages, commands, moderation, registers = deltas
+        keep = DAY * Config.ANALYTICS_HOURLY_DAYS if kind == "hour" else DAY * Config.ANALYTICS_DAILY_DAYS
+        inc: Dict[str, int] = {}
+        if messages:
+            inc["messages"] = messages
+        inc.update({f"commands.{name}": count for name, count in commands.items()})
+        inc.update({f"moderation.{name}": count for name, count in moderation.items()})
+        update: Dict[str, Any] = {
+            "$setOnInsert": {"chat_id": chat_id, "kind": kind, "start": start, "expires_at": start + keep}
+        }
+        if inc:
+            update["$inc"] = inc
+        if registers:
+            update["$max"] = {f"hll.{index}": rank for index, rank in registers.items()}
+        key = f"{start:%Y%m%d%H}" if kind == "hour" else f"{start:%Y%m%d}"
+        return UpdateOne({"_id": f"{chat_id}:{kind}:{key}"}, update, upsert=True)
+
+    async def flush(self) -> None:
+        """
+        Write what changed since the last flush and drop finished hours.
+        """
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        operations: List[UpdateOne] = []
+        sent: List[Tuple[Rollup, Tuple]] = []
+        for (chat_id, hour), rollup in list(self._rollups.items()):
+            if rollup.is_empty():
+                if hour < current_hour:
+                    # A finished hour, fully written
+                    del self._rollups[(chat_id, hour)]
+                continue
+            deltas = rollup.take_deltas()
+            operations.append(self._update(chat_id, "hour", hour, deltas))
+            operations.append(self._update(chat_id, "day", hour.replace(hour=0), deltas))
+            sent.append((rollup, deltas))
+        if not operations:
+            return
+
+        try:
+            await get_database()[COLLECTION].bulk_write(operations, ordered=False)
+        except Exception as e:
+            for rollup, deltas in sent:
+                rollup.restore_deltas(deltas)
+            logger.error(f"Error flushing group analytics: {str(e)}")
+
+    async def summary(self, chat_id: int, window: timedelta) -> Dict[str, Any]:
+        """
+        Activity of a group over the last `window`, from buckets only.
+        Windows up to two days use hourly buckets, longer ones daily
+        buckets, so the start is rounded down to the hour or day.
+        :param chat_id: Group ID
+        :param window: How far back to look
+        :return: messages, messages_per_hour, active_users, commands, moderation
+        """
+        now = datetime.utcnow()
+        if window <= 2 * DAY:
+            kind = "hour"
+            since = (now - window).replace(minute=0, second=0, microsecond=0)
+        else:
+            kind = "day"
+            since = (now - window).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        messages = 0
+        commands: Counter = Counter()
+        moderation: Counter = Counter()
+        users = HyperLogLog(Config.ANALYTICS_HLL_PRECISION)
+        cursor = get_database()[COLLECTION].find({"chat_id": chat_id, "kind": kind, "start": {"$gte": since}})
+        async for doc in cursor:
+            messages += doc.get("messages", 0)
+            commands.update(doc.get("commands", {}))
+            moderation.update(doc.get("moderation", {}))
+            users.merge_registers(doc.get("hll", {}))
+
+        # Activity recorded since the last flush
+        for (rollup_chat, hour), rollup in self._rollups.items():
+            if rollup_chat == chat_id and hour >= since:
+                messages += rollup.messages
+                commands.update(rollup.commands)
+                moderation.update(rollup.moderation)
+                users.merge(rollup.users)
+
+        # The buckets read span from the rounded-down start to now
+        hours = max((now - since).total_seconds() / 3600, 1)
+        return {
+            "messages": messages,
+            "messages_per_hour": messages / hours,
+            "active_users": users.count(),
+            "commands": commands.most_common(Config.ANALYTICS_TOP_COMMANDS),
+            "moderation": dict(moderation),
+        }
+
+
+# Shared group analytics
+group_analytics = GroupAnalytics(Config.ANALYTICS_FLUSH_INTERVAL)
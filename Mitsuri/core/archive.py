@@ -0,0 +1,356 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, IO, Iterator, List, Optional, Tuple
+
+from ..config import Config
+
+logger = logging.getLogger("Mitsuri.core.archive")
+
+# Segments are named by the epoch second they were opened at, so a
+# segment covers [its start, the next segment's start)
+SEGMENT_PREFIX = "events-"
+OPEN_SUFFIX = ".jsonl"
+COMPRESSED_SUFFIX = ".jsonl.gz"
+
+
+def _segment_start(filename: str) -> Optional[int]:
+    if not filename.startswith(SEGMENT_PREFIX):
+        return None
+    for suffix in (COMPRESSED_SUFFIX, OPEN_SUFFIX):
+        if filename.endswith(suffix):
+            stem = filename[len(SEGMENT_PREFIX):-len(suffix)]
+            return int(stem) if stem.isdigit() else None
+    return None
+
+
+def list_segments(directory: str) -> List[Tuple[int, str]]:
+    """
+    Archive segments in a directory, oldest first.
+    :return: List of (start epoch, path)
+    """
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for filename in os.listdir(directory):
+        start = _segment_start(filename)
+        if start is not None:
+            segments.append((start, os.path.join(directory, filename)))
+    segments.sort()
+    return segments
+
+
+def _compress(path: str) -> None:
+    target = path[:-len(OPEN_SUFFIX)] + COMPRESSED_SUFFIX
+    tmp_path = f"{target}.tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dst.write(chunk)
+    os.replace(tmp_path, target)
+    os.remove(path)
+
+
+class EventArchive:
+    """
+    Append-only archive of message events as JSON lines.
+    `add` only queues the event; a writer thread serializes and appends
+    queued events in batches. Segments are rotated by size or age, then
+    gzipped by a separate thread so rotation never stalls the writer.
+    The queue holds at most `max_queue` events: if the disk falls that far
+    behind, new events are dropped and counted rather than blocking the
+    event loop. Events queued at shutdown are written by `stop`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        segment_seconds: int = 24 * 3600,
+        retention_days: int = 0,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 50000
+    ):
+        """
+        :param directory: Directory holding the segments
+        :param segment_bytes: Rotate once a segment reaches this size
+        :param segment_seconds: Rotate once a segment is this old
+        :param retention_days: Delete segments older than this, 0 keeps everything
+        :param batch_size: Events written per batch
+        :param flush_interval: Seconds the writer waits for a batch to fill
+        :param max_queue: Events queued at most, later ones are dropped
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_days = retention_days
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max(self.batch_size, max_queue)
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._ready = threading.Condition(threading.Lock())
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        self._file: Optional[IO[bytes]] = None
+        self._path: Optional[str] = None
+        self._opened_at = 0
+        self._size = 0
+        self.written = 0
+        self.dropped = 0
+        self._drop_logged = 0.0
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an event. Safe to call from the event loop.
+        :param event: JSON-serializable event; "ts" is filled in if missing
+        """
+        if "ts" not in event:
+            event["ts"] = round(time.time(), 3)
+        with self._ready:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                dropped = self.dropped
+            else:
+                self._queue.append(event)
+                if len(self._queue) >= self.batch_size:
+                    self._ready.notify()
+                return
+        # Warn at most once a minute while the writer is behind
+        now = time.monotonic()
+        if now - self._drop_logged >= 60:
+            self._drop_logged = now
+            logger.warning(f"Event archive queue full, {dropped} events dropped so far")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-gzip")
+        # Segments left open by an unclean shutdown
+        for _, path in list_segments(self.directory):
+            if path.endswith(OPEN_SUFFIX):
+                self._compressor.submit(self._compress_segment, path)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Write out queued events, close the open segment and wait for compression.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        with self._ready:
+            self._stopping = True
+            self._ready.notify()
+        thread.join(timeout)
+        self._thread = None
+        self._drain()
+        self._rotate()
+        self._compressor.shutdown(wait=True)
+        self._compressor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "segment": self._path,
+            "segment_bytes": self._size,
+        }
+
+    # Writer thread
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._ready.wait(self.flush_interval)
+                stopping = self._stopping
+            try:
+                self._drain()
+                if self._file is not None and time.time() - self._opened_at >= self.segment_seconds:
+                    self._rotate()
+            except Exception as e:
+                logger.error(f"Error writing event archive: {str(e)}")
+                time.sleep(self.flush_interval)
+            if stopping:
+                return
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._ready:
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _drain(self) -> None:
+        batch = self._take()
+        while batch:
+            self._write(batch)
+            batch = self._take()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+        data = "".join(dumps(event) + "\n" for event in batch).encode("utf-8")
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        self.written += len(batch)
+        if self._size >= self.segment_bytes:
+            self._rotate()
+
+    def _open(self) -> None:
+        self._opened_at = int(time.time())
+        # Never reuse a name, even when rotating twice within a second
+        while True:
+            path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._opened_at}{OPEN_SUFFIX}")
+            if not os.path.exists(path) and not os.path.exists(path[:-len(OPEN_SUFFIX)] + COMPRESSED_SUFFIX):
+                break
+            self._opened_at += 1
+        self._path = path
+        self._file = open(path, "ab")
+        self._size = 0
+
+    def _rotate(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        path = self._path
+        self._file = None
+        self._path = None
+        self._size = 0
+        self._compressor.submit(self._compress_segment, path)
+
+    def _compress_segment(self, path: str) -> None:
+        try:
+            _compress(path)
+        except Exception as e:
+            logger.error(f"Error compressing archive segment {path}: {str(e)}")
+        self._prune()
+
+    def _prune(self) -> None:
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        segments = list_segments(self.directory)
+        # A segment ends where the next one starts
+        for (start, path), (next_start, _) in zip(segments, segments[1:]):
+            if next_start < cutoff and path.endswith(COMPRESSED_SUFFIX):
+                os.remove(path)
+                logger.info(f"Removed expired archive segment {path}")
+
+
+def iter_events(
+    directory: str,
+    chat_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream archived events matching the filters, oldest first.
+    Segments entirely outside the time range are not opened.
+    :param directory: Archive directory
+    :param chat_id: Only events in this chat
+    :param user_id: Only events from this user
+    :param since: Only events at or after this epoch time
+    :param until: Only events before this epoch time
+    """
+    segments = list_segments(directory)
+    for index, (start, path) in enumerate(segments):
+        if until is not None and start >= until:
+            break
+        end = segments[index + 1][0] if index + 1 < len(segments) else None
+        if since is not None and end is not None and end <= since:
+            continue
+        opener = gzip.open if path.endswith(COMPRESSED_SUFFIX) else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # Torn last line of a segment cut short by a crash
+                        continue
+                    if chat_id is not None and event.get("chat") != chat_id:
+                        continue
+                    if user_id is not None and event.get("user") != user_id:
+                        continue
+                    ts = event.get("ts", 0)
+                    if since is not None and ts < since:
+                        continue
+                    if until is not None and ts >= until:
+                        continue
+                    yield event
+        except (OSError, EOFError) as e:
+            logger.warning(f"Skipping unreadable archive segment {path}: {str(e)}")
+
+
+def message_event(message) -> Dict[str, Any]:
+    """
+    Build the archive event for an incoming message.
+    :param message: Pyrogram message
+    """
+    return {
+        "ts": message.date.timestamp() if message.date else round(time.time(), 3),
+        "chat": message.chat.id,
+        "user": message.from_user.id if message.from_user else None,
+        "msg": message.id,
+        "text": message.text or message.caption,
+        "media": message.media.value if message.media else None,
+    }
+
+
+# Shared message archive
+event_archive = EventArchive(
+    Config.ARCHIVE_DIR,
+    segment_bytes=Config.ARCHIVE_SEGMENT_SIZE,
+    segment_seconds=Config.ARCHIVE_SEGMENT_AGE,
+    retention_days=Config.ARCHIVE_RETENTION_DAYS,
+    max_queue=Config.ARCHIVE_QUEUE_SIZE
+)
+
+
+def _parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Print matching events as JSON lines, e.g.
+    python -m Mitsuri.core.archive --chat -100123 --since 2024-05-01
+    """
+    parser = argparse.ArgumentParser(description="Search the message event archive")
+    parser.add_argument("--dir", default=Config.ARCHIVE_DIR, help="Archive directory")
+    parser.add_argument("--chat", type=int, help="Chat ID")
+    parser.add_argument("--user", type=int, help="User ID")
+    parser.add_argument("--since", type=_parse_time, help="Start, ISO date/time (UTC) or epoch seconds")
+    parser.add_argument("--until", type=_parse_time, help="End, ISO date/time (UTC) or epoch seconds")
+    args = parser.parse_args(argv)
+
+    for event in iter_events(args.dir, args.chat, args.user, args.since, args.until):
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
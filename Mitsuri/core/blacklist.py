@@ -0,0 +1,377 @@
+import asyncio
+import json
+import logging
+import os
+from array import array
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..config import Config
+
+logger = logging.getLogger("Mitsuri.core.blacklist")
+
+DATA_DIR = "./data"
+WORDS_FILE = os.path.join(DATA_DIR, "blacklisted_words.json")
+USERS_FILE = os.path.join(DATA_DIR, "blacklisted_users.json")
+# Additions/removals since the last USERS_FILE snapshot, one "+id"/"-id" per line
+USERS_JOURNAL = os.path.join(DATA_DIR, "blacklisted_users.journal")
+
+
+def atomic_write_json(path: str, data) -> None:
+    """
+    Write JSON through a temp file and rename, so readers never see a partial file.
+    :param path: Destination file
+    :param data: JSON-serializable data
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class UserIdSet:
+    """
+    Set of user IDs. A hash set normally; above BLACKLIST_COMPACT_THRESHOLD
+    entries a sorted array of 64-bit ints searched by bisection, which takes
+    8 bytes per ID instead of ~60.
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        ids = set(ids)
+        self._compact = len(ids) > Config.BLACKLIST_COMPACT_THRESHOLD
+        self._ids = array("q", sorted(ids)) if self._compact else ids
+
+    def __contains__(self, user_id: int) -> bool:
+        if not self._compact:
+            return user_id in self._ids
+        index = bisect_left(self._ids, user_id)
+        return index < len(self._ids) and self._ids[index] == user_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def add(self, user_id: int) -> None:
+        if not self._compact:
+            self._ids.add(user_id)
+        elif user_id not in self:
+            insort(self._ids, user_id)
+
+    def discard(self, user_id: int) -> None:
+        if not self._compact:
+            self._ids.discard(user_id)
+            return
+        index = bisect_left(self._ids, user_id)
+        if index < len(self._ids) and self._ids[index] == user_id:
+            del self._ids[index]
+
+
+class BlacklistStore:
+    """
+    Blacklisted users and words, loaded from ./data and optionally a MongoDB
+    collection, and reloaded in place when either changes.
+    User changes are appended to a journal instead of rewriting the whole
+    snapshot; the journal is folded into the snapshot once it grows.
+    Users from the collection are an overlay and never written to the files.
+    Called on the event loop, writes run in order on a single I/O thread.
+    """
+
+    def __init__(self):
+        self.users = UserIdSet()
+        self.words: List[str] = []
+        self._stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._journal_lines = 0
+        self._word_listeners: List[Callable[[List[str]], Awaitable[None]]] = []
+        self._collection = None
+        # Users added through the collection, kept across file reloads
+        self._remote_users: Set[int] = set()
+        self._synced_at: Optional[datetime] = None
+        # _ids of the documents applied with updated_at == _synced_at
+        self._synced_ids: Set[Any] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blacklist-io")
+
+    def on_words_change(self, listener: Callable[[List[str]], Awaitable[None]]) -> None:
+        """
+        Register a coroutine function called with the new word list after a reload.
+        """
+        self._word_listeners.append(listener)
+
+    # Files
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_users(self) -> Set[int]:
+        users = set()
+        if os.path.exists(USERS_FILE):
+            with open(USERS_FILE, "r") as f:
+                users.update(json.load(f))
+        lines = 0
+        if os.path.exists(USERS_JOURNAL):
+            with open(USERS_JOURNAL, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    lines += 1
+                    if line[0] == "+":
+                        users.add(int(line[1:]))
+                    else:
+                        users.discard(int(line[1:]))
+        self._journal_lines = lines
+        return users
+
+    def _read_words(self) -> List[str]:
+        if not os.path.exists(WORDS_FILE):
+            return []
+        with open(WORDS_FILE, "r") as f:
+            return json.load(f)
+
+    def _changed_files(self) -> List[str]:
+        return [
+            path for path in (WORDS_FILE, USERS_FILE, USERS_JOURNAL)
+            if self._stamp(path) != self._stamps.get(path)
+        ]
+
+    def _remember_stamps(self) -> None:
+        for path in (WORDS_FILE, USERS_FILE, USERS_JOURNAL):
+            self._stamps[path] = self._stamp(path)
+
+    def load(self) -> None:
+        """
+        Load both lists from disk, replacing what is in memory.
+        """
+        try:
+            self.users = UserIdSet(self._read_users())
+            self.words = self._read_words()
+            self._remember_stamps()
+        except Exception as e:
+            logger.error(f"Error loading blacklists: {str(e)}")
+        Config.BLACKLISTED_USERS = self.users
+        Config.BLACKLISTED_WORDS = self.words
+
+    async def load_async(self) -> None:
+        """
+        Load both lists off the event loop and pass the words to listeners.
+        """
+        await asyncio.get_event_loop().run_in_executor(None, self.load)
+        await self.set_words(self.words)
+
+    def apply_users(self, users: Set[int]) -> Tuple[int, int]:
+        """
+        Bring the in-memory user set to `users` by adding/removing the difference.
+        :return: (added, removed)
+        """
+        current = set(self.users)
+        added = users - current
+        removed = current - users
+        for user_id in added:
+            self.users.add(user_id)
+        for user_id in removed:
+            self.users.discard(user_id)
+        return len(added), len(removed)
+
+    async def set_words(self, words: List[str]) -> None:
+        self.words = list(words)
+        Config.BLACKLISTED_WORDS = self.words
+        for listener in self._word_listeners:
+            try:
+                await listener(self.words)
+            except Exception as e:
+                logger.error(f"Error applying blacklisted words: {str(e)}")
+
+    # Writes
+
+    def _file_users(self) -> Set[int]:
+        return set(self.users) - self._remote_users
+
+    def _persist(self, func: Callable[..., None], *args) -> None:
+        """
+        Run a file write, on the I/O thread when called on the event loop.
+        """
+        def run():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"Error saving blacklists: {str(e)}")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            run()
+            return
+        loop.run_in_executor(self._io, run)
+
+    def _journal(self, entries: Iterable[str]) -> None:
+        entries = list(entries)
+        self._journal_lines += len(entries)
+        snapshot = None
+        if self._journal_lines >= Config.BLACKLIST_JOURNAL_LIMIT:
+            snapshot = sorted(self._file_users())
+            self._journal_lines = 0
+        self._persist(self._write_journal, entries, snapshot)
+
+    def _write_journal(self, entries: List[str], snapshot: Optional[List[int]]) -> None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(USERS_JOURNAL, "a") as f:
+            f.write("".join(f"{entry}\n" for entry in entries))
+        if snapshot is not None:
+            self._write_snapshot(snapshot)
+        self._remember_stamps()
+
+    def _write_snapshot(self, users: List[int]) -> None:
+        atomic_write_json(USERS_FILE, users)
+        # A crash before this point only replays entries already in the snapshot
+        if os.path.exists(USERS_JOURNAL):
+            os.remove(USERS_JOURNAL)
+        self._remember_stamps()
+
+    def _write_words(self, words: List[str]) -> None:
+        atomic_write_json(WORDS_FILE, words)
+        self._remember_stamps()
+
+    def compact(self) -> None:
+        """
+        Fold the journal into a fresh snapshot.
+        """
+        self._journal_lines = 0
+        self._persist(self._write_snapshot, sorted(self._file_users()))
+
+    def add_user(self, user_id: int) -> None:
+        if user_id in self.users:
+            return
+        self.users.add(user_id)
+        self._journal([f"+{user_id}"])
+
+    def remove_user(self, user_id: int) -> None:
+        if user_id not in self.users:
+            return
+        self.users.discard(user_id)
+        self._remote_users.discard(user_id)
+        self._journal([f"-{user_id}"])
+
+    def set_users(self, users: Iterable[int]) -> None:
+        """
+        Replace the file user list, journaling only the difference.
+        Users from the collection stay blacklisted.
+        """
+        users = set(users)
+        current = self._file_users()
+        entries = [f"+{user_id}" for user_id in users - current]
+        entries += [f"-{user_id}" for user_id in current - users]
+        self.apply_users(users | self._remote_users)
+        if entries:
+            self._journal(entries)
+
+    def save_words(self, words: List[str]) -> None:
+        """
+        Persist a new word list and apply it.
+        """
+        self._persist(self._write_words, list(words))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not running yet, listeners read Config at startup
+            self.words = list(words)
+            Config.BLACKLISTED_WORDS = self.words
+            return
+        loop.create_task(self.set_words(words))
+
+    # Watching
+
+    async def start(self, collection=None) -> None:
+        """
+        Start watching the files (and `collection`, if given) for changes.
+        :param collection: Async collection of {"type": "user"|"word", "value",
+                           "removed", "updated_at"} documents
+        """
+        self._collection = collection
+        if collection is not None:
+            await self._sync_collection()
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._watch())
+
+    async def stop(self) -> None:
+        """
+        Stop watching and wait for queued file writes.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # The I/O thread runs writes in order, so this one runs last
+        await asyncio.get_event_loop().run_in_executor(self._io, lambda: None)
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(Config.BLACKLIST_RELOAD_INTERVAL)
+            try:
+                changed = await loop.run_in_executor(None, self._changed_files)
+                if changed:
+                    await self._reload_files(loop, changed)
+                if self._collection is not None:
+                    await self._sync_collection()
+            except Exception as e:
+                logger.error(f"Error reloading blacklists: {str(e)}")
+
+    async def _reload_files(self, loop, changed: List[str]) -> None:
+        if USERS_FILE in changed or USERS_JOURNAL in changed:
+            users = await loop.run_in_executor(None, self._read_users)
+            added, removed = self.apply_users(users | self._remote_users)
+            logger.info(f"Blacklisted users reloaded: +{added} -{removed}")
+        if WORDS_FILE in changed:
+            words = await loop.run_in_executor(None, self._read_words)
+            await self.set_words(words)
+            logger.info(f"Blacklisted words reloaded: {len(words)} words")
+        await loop.run_in_executor(None, self._remember_stamps)
+
+    async def _sync_collection(self) -> None:
+        """
+        Apply documents changed in the collection since the last sync.
+        """
+        query = {}
+        if self._synced_at is not None:
+            # Documents can share a timestamp with the last one seen, so
+            # that one is queried again and what was applied is skipped
+            query["updated_at"] = {"$gte": self._synced_at}
+        words = None
+        async for doc in self._collection.find(query).sort("updated_at", 1):
+            updated_at = doc.get("updated_at", self._synced_at)
+            if updated_at == self._synced_at:
+                if doc["_id"] in self._synced_ids:
+                    continue
+                self._synced_ids.add(doc["_id"])
+            else:
+                self._synced_at = updated_at
+                self._synced_ids = {doc["_id"]}
+            if doc.get("type") == "word":
+                words = set(self.words) if words is None else words
+                if doc.get("removed"):
+                    words.discard(doc["value"])
+                else:
+                    words.add(doc["value"])
+            elif doc.get("removed"):
+                self._remote_users.discard(doc["value"])
+                self.users.discard(doc["value"])
+            else:
+                self._remote_users.add(doc["value"])
+                self.users.add(doc["value"])
+        if words is not None and words != set(self.words):
+            await self.set_words(sorted(words))
+
+
+# Shared blacklist store
+blacklist_store = BlacklistStore()
@@ -5,11 +5,23 @@ import logging
 import asyncio
 from typing import Optional, List, Dict, Any, Union, Callable
 import time
-from pyrogram import Client, filters, types
+from pyrogram import Client, filters, raw, types
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, BotCommand
-from pyrogram.errors import FloodWait, UserIsBlocked, ChatWriteForbidden
+from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated, ChatWriteForbidden
 
 from ..config import Config
+from .scheduler import SendScheduler, Priority
+from .cooldowns import cooldowns
+from ..middleware.pipeline import MiddlewarePipeline, MIDDLEWARE_GROUP
+from .broadcast import BroadcastEngine, BroadcastJob
+from .archive import event_archive
+from ..database.writebehind import flush_all
+from .stats import stats_recorder
+from .analytics import group_analytics
+from .plugins import PluginLoader
+from .http import http_client
+from .blacklist import blacklist_store
+from ..platforms.cache import save_all as save_response_caches
 
 logger = logging.getLogger("Mitsuri.core.bot")
 
@@ -23,9 +35,8 @@ class MitsuriBot(Client):
         """Initialize the bot with API credentials and MongoDB"""
         self.mongodb = mongodb
         self.ctx = context
-        self.command_cooldowns = {}
-        self.message_queue = asyncio.Queue()
-        self.is_message_handler_running = False
+        self.scheduler = SendScheduler(self._send_with_retry)
+        self.broadcaster = BroadcastEngine(self)
         
         # Initialize pyrogram client
         super().__init__(
@@ -34,55 +45,109 @@ class MitsuriBot(Client):
             api_hash=api_hash,
             bot_token=bot_token,
             workers=16,
-            plugins={"root": "Mitsuri.plugins"},
             parse_mode="html"
         )
         
+        # Plugins are registered by the loader on start, most only imported on first use
+        self.plugin_loader = PluginLoader(self)
+        
         # Register middleware
-        self.middleware = []
+        self.middleware = MiddlewarePipeline()
         
         # Add built-in middlewares
         from ..middleware.throttler import ThrottleMiddleware
         from ..middleware.blacklist import BlacklistMiddleware
+        from ..middleware.stats import StatsMiddleware
         from ..middleware.logger import LoggerMiddleware
         
         self.add_middleware(ThrottleMiddleware())
         self.add_middleware(BlacklistMiddleware())
+        self.add_middleware(StatsMiddleware())
         self.add_middleware(LoggerMiddleware())
     
+    async def connect_telegram(self):
+        """
+        Connect and authorize without handling updates yet, so this can
+        overlap with the rest of startup. Updates arriving in the meantime
+        wait in the dispatcher's queue until `start` is called.
+        """
+        if self.is_connected:
+            return self
+        is_authorized = await self.connect()
+        try:
+            if not is_authorized:
+                await self.authorize()
+            await self.invoke(raw.functions.updates.GetState())
+        except (Exception, KeyboardInterrupt):
+            await self.disconnect()
+            raise
+        self.me = await self.get_me()
+        return self
+    
     async def start(self):
         """Start the bot and message handler"""
-        await super().start()
-        self.me = await self.get_me()
+        # Middleware runs in the lowest handler group, ahead of every plugin
+        self.add_handler(self.middleware.handler(), group=MIDDLEWARE_GROUP)
+        self.plugin_loader.load()
+        await self.connect_telegram()
+        # Starts the update workers
+        await self.initialize()
         logger.info(f"Bot started as @{self.me.username}")
         
-        # Start the message queue handler
+        # Start the outbound send scheduler
         self.loop = asyncio.get_event_loop()
-        self.is_message_handler_running = True
-        self.loop.create_task(self._process_message_queue())
+        self.scheduler.start()
+        
+        if Config.ARCHIVE_ENABLED:
+            event_archive.start()
+        
+        stats_recorder.start()
+        group_analytics.start()
+        
+        # Pick up broadcasts interrupted by a restart
+        self.loop.create_task(self.broadcaster.resume_pending())
         
         return self
     
     async def stop(self, *args):
-        """Stop the bot and message handler"""
-        self.is_message_handler_running = False
-        await super().stop(*args)
+        """
+        Stop the bot. Update handling stops first, then every component
+        saves what it has buffered; a failing step doesn't keep the rest
+        from running. Safe to call if startup didn't get far.
+        """
+        if self.is_initialized:
+            # Stop the update workers so nothing new is buffered
+            await self.terminate()
+        
+        loop = asyncio.get_event_loop()
+        steps = [
+            ("broadcasts", self.broadcaster.stop),
+            ("send scheduler", self.scheduler.stop),
+            ("write-behind buffers", flush_all),
+            ("stats", stats_recorder.stop),
+            ("group analytics", group_analytics.stop),
+            ("response caches", save_response_caches),
+            ("blacklists", blacklist_store.stop),
+            # Joins the archive's writer and compression threads
+            ("event archive", lambda: loop.run_in_executor(None, event_archive.stop)),
+            ("HTTP client", http_client.close),
+        ]
+        for name, step in steps:
+            try:
+                await step()
+            except Exception as e:
+                logger.error(f"Error stopping {name}: {str(e)}", exc_info=True)
+        
+        if self.is_connected:
+            await self.disconnect()
     
     def add_middleware(self, middleware) -> None:
         """Add a middleware handler"""
-        self.middleware.append(middleware)
+        self.middleware.add(middleware)
     
     async def execute_middleware(self, update) -> bool:
         """Execute all middleware handlers for an update"""
-        for handler in self.middleware:
-            try:
-                result = await handler.handle(update, self)
-                if not result:
-                    # If middleware returns False, stop processing
-                    return False
-            except Exception as e:
-                logger.error(f"Error in middleware {handler.__class__.__name__}: {str(e)}")
-        return True
+        return await self.middleware.run(update, self)
     
     async def send_modular_message(
         self,
@@ -90,10 +155,15 @@ class MitsuriBot(Client):
         text: str,
         reply_markup: Optional[InlineKeyboardMarkup] = None,
         reply_to_message_id: Optional[int] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        coalesce: bool = False,
         **kwargs
     ) -> Optional[types.Message]:
         """
         Queue a message to be sent to avoid flood waits
+        Bulk traffic should pass Priority.BULK so it doesn't delay replies,
+        chatty producers (notices, log lines) can pass coalesce=True to have
+        texts queued together for the same chat merged into one message
         """
         payload = {
             "chat_id": chat_id,
@@ -103,34 +173,15 @@ class MitsuriBot(Client):
             **kwargs
         }
         
-        # Put in queue for later processing
-        await self.message_queue.put(payload)
-        
-        # Start the queue processor if not running
-        if not self.is_message_handler_running:
-            self.is_message_handler_running = True
-            self.loop.create_task(self._process_message_queue())
-    
-    async def _process_message_queue(self):
-        """Process messages from the queue with rate limiting"""
-        while self.is_message_handler_running:
-            try:
-                if self.message_queue.empty():
-                    await asyncio.sleep(0.1)
-                    continue
-                
-                payload = await self.message_queue.get()
-                await self._send_with_retry(payload)
-                
-                # Brief pause to avoid flood waits
-                await asyncio.sleep(0.05)
-            
-            except Exception as e:
-                logger.error(f"Error in message queue processor: {str(e)}")
-                await asyncio.sleep(1)  # Wait a bit on error
+        # Hand over to the scheduler, which paces sends per chat
+        self.scheduler.submit(payload, priority, coalesce)
     
     async def _send_with_retry(self, payload, max_retries=3):
-        """Send a message with retry logic for FloodWait"""
+        """
+        Send a message, retrying transient errors.
+        FloodWait is raised to the scheduler, which parks the chat; permanent
+        failures are raised so callers awaiting delivery see the outcome.
+        """
         chat_id = payload.pop("chat_id")
         text = payload.pop("text")
         
@@ -142,60 +193,42 @@ class MitsuriBot(Client):
                     **payload
                 )
             
-            except FloodWait as e:
-                if attempt == max_retries - 1:
-                    logger.warning(f"Max retries reached for message to {chat_id}")
-                    return None
-                
-                wait_time = min(e.value, 10)  # Cap wait time at 10 seconds
-                logger.info(f"FloodWait detected, waiting for {wait_time}s")
-                await asyncio.sleep(wait_time)
+            except FloodWait:
+                raise
             
             except UserIsBlocked:
                 logger.info(f"User {chat_id} has blocked the bot")
-                return None
+                raise
+            
+            except InputUserDeactivated:
+                logger.info(f"User {chat_id} has deleted their account")
+                raise
             
             except ChatWriteForbidden:
                 logger.info(f"Bot doesn't have permission to write in chat {chat_id}")
-                return None
+                raise
             
             except Exception as e:
                 logger.error(f"Error sending message to {chat_id}: {str(e)}")
                 if attempt == max_retries - 1:
-                    return None
+                    raise
                 await asyncio.sleep(1)
     
     async def broadcast(
         self, 
-        user_ids: List[int], 
         message: str, 
         parse_mode="html", 
         disable_web_page_preview=True
-    ) -> Dict[str, int]:
+    ) -> BroadcastJob:
         """
-        Broadcast a message to multiple users
-        Returns stats about the broadcast
+        Broadcast a message to every stored user
+        Delivery runs in the background; returns the job to follow its progress
         """
-        results = {"success": 0, "failed": 0}
-        
-        for user_id in user_ids:
-            try:
-                await self.send_modular_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode=parse_mode,
-                    disable_web_page_preview=disable_web_page_preview
-                )
-                results["success"] += 1
-                
-                # Short delay to avoid hitting limits
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                results["failed"] += 1
-                logger.error(f"Failed to send broadcast to {user_id}: {str(e)}")
-        
-        return results
+        return await self.broadcaster.start_job(
+            message,
+            parse_mode=parse_mode,
+            disable_web_page_preview=disable_web_page_preview
+        )
     
     async def set_bot_commands(self, commands_list: List[tuple]) -> bool:
         """
@@ -208,7 +241,7 @@ class MitsuriBot(Client):
                 for command, description in commands_list
             ]
             
-            await self.set_bot_commands(commands)
+            await super().set_bot_commands(commands)
             return True
         
         except Exception as e:
@@ -220,17 +253,7 @@ class MitsuriBot(Client):
         Check if a user's command is on cooldown
         Returns True if command is on cooldown, False otherwise
         """
-        cooldown_key = f"{user_id}:{command}"
-        current_time = time.time()
-        
-        if cooldown_key in self.command_cooldowns:
-            last_used = self.command_cooldowns[cooldown_key]
-            if current_time - last_used < Config.RATE_LIMIT_WINDOW:
-                return True
-        
-        # Update the cooldown timestamp
-        self.command_cooldowns[cooldown_key] = current_time
-        return False
+        return bool(await cooldowns.check(command, Config.RATE_LIMIT_WINDOW, user_id=user_id))
     
     def get_uptime(self) -> str:
         """Get formatted bot uptime"""
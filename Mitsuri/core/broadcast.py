@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pyrogram.errors import InputUserDeactivated, UserIsBlocked
+
+from ..config import Config
+from .scheduler import Priority
+from ..database.users import UserModel
+
+logger = logging.getLogger("Mitsuri.core.broadcast")
+
+OUTCOMES = ("delivered", "blocked", "deactivated", "failed")
+
+
+def classify_outcome(result: Any) -> str:
+    """
+    Map a scheduler send result (or the exception it failed with) to an outcome.
+    :param result: Sent message or exception
+    :return: One of OUTCOMES
+    """
+    if isinstance(result, UserIsBlocked):
+        return "blocked"
+    if isinstance(result, InputUserDeactivated):
+        return "deactivated"
+    if isinstance(result, BaseException) or result is None:
+        return "failed"
+    return "delivered"
+
+
+class BroadcastJob:
+    """
+    Live view of a broadcast job stored in the `broadcasts` collection.
+    """
+
+    def __init__(self, doc: Dict[str, Any]):
+        self.id: str = doc["_id"]
+        self.text: str = doc["text"]
+        self.options: Dict[str, Any] = doc.get("options", {})
+        self.total: int = doc.get("total", 0)
+        self.counts = Counter({key: 0 for key in OUTCOMES})
+        self.counts.update(doc.get("counts", {}))
+        self.last_user_id: Optional[int] = doc.get("last_user_id")
+        self.status: str = doc.get("status", "running")
+
+        # Rate is measured from this process' start so resumed jobs
+        # don't report an average skewed by the downtime
+        self.started_at = time.monotonic()
+        self.processed_at_start = self.processed
+        # A resumed job may have delivered recipients past its checkpoint
+        # before the previous process died; batches are checked against
+        # the records until one has none
+        self.resumed = self.last_user_id is not None
+
+    @property
+    def processed(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def rate(self) -> float:
+        """Recipients processed per second in this run"""
+        elapsed = time.monotonic() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return (self.processed - self.processed_at_start) / elapsed
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds left, None until a rate is known"""
+        rate = self.rate
+        if not rate:
+            return None
+        return max(0, self.total - self.processed) / rate
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "rate": self.rate,
+            "eta": self.eta,
+            **self.counts,
+        }
+
+
+class BroadcastEngine:
+    """
+    Delivers broadcasts to every stored user.
+    Recipients are streamed from the `users` collection in batches ordered
+    by user id and each batch goes through the send scheduler concurrently.
+    Outcomes are recorded per recipient every BROADCAST_FLUSH_INTERVAL as
+    sends complete, and the checkpoint follows the records, so a job
+    resumed after a crash re-sends at most the last unrecorded outcomes.
+    """
+
+    def __init__(self, bot, batch_size: Optional[int] = None):
+        """
+        :param bot: MitsuriBot instance
+        :param batch_size: Recipients fetched and delivered per batch
+        """
+        self.bot = bot
+        self.batch_size = batch_size or Config.BROADCAST_BATCH_SIZE
+        self.jobs: Dict[str, BroadcastJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def _jobs(self):
+        return self.bot.mongodb.get_collection("broadcasts")
+
+    @property
+    def _recipients(self):
+        return self.bot.mongodb.get_collection("broadcast_recipients")
+
+    @property
+    def _users(self):
+        return self.bot.mongodb.get_collection("users")
+
+    async def start_job(self, text: str, **options) -> BroadcastJob:
+        """
+        Create a broadcast job and start delivering it in the background.
+        :param text: Message text
+        :param options: Extra `send_message` arguments (parse_mode, ...)
+        :return: The running job
+        """
+        doc = {
+            "_id": uuid.uuid4().hex[:12],
+            "text": text,
+            "options": options,
+            "status": "running",
+            "total": await self._users.count_documents({"blocked": {"$ne": True}}),
+            "counts": {key: 0 for key in OUTCOMES},
+            "last_user_id": None,
+            "created_at": datetime.utcnow(),
+        }
+        await self._jobs.insert_one(doc)
+        job = BroadcastJob(doc)
+        self._launch(job)
+        logger.info(f"Broadcast {job.id} started for {job.total} users")
+        return job
+
+    async def resume_pending(self) -> None:
+        """
+        Resume jobs left running by a previous process.
+        """
+        async for doc in self._jobs.find({"status": "running"}):
+            if doc["_id"] in self._tasks:
+                continue
+            job = BroadcastJob(doc)
+            self._launch(job)
+            logger.info(f"Broadcast {job.id} resumed at {job.processed}/{job.total}")
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a running job.
+        :param job_id: Job ID
+        :return: False if no such job is running
+        """
+        task = self._tasks.pop(job_id, None)
+        if task is None:
+            return False
+        task.cancel()
+        self.jobs[job_id].status = "cancelled"
+        await self._jobs.update_one({"_id": job_id}, {"$set": {"status": "cancelled"}})
+        return True
+
+    async def stop(self) -> None:
+        """
+        Stop delivering on shutdown. Jobs stay `running` in the database
+        so the next start resumes them.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def running(self) -> List[BroadcastJob]:
+        return [self.jobs[job_id] for job_id in self._tasks]
+
+    def _launch(self, job: BroadcastJob) -> None:
+        self.jobs[job.id] = job
+        self._tasks[job.id] = asyncio.get_event_loop().create_task(self._run(job))
+
+    async def _run(self, job: BroadcastJob) -> None:
+        try:
+            users = UserModel().iter_users(
+                projection={"_id": 0, "user_id": 1},
+                include_blocked=False,
+                batch_size=self.batch_size,
+                after=job.last_user_id,
+                key="user_id"
+            )
+            user_ids = []
+            async for doc in users:
+                user_ids.append(doc["user_id"])
+                if len(user_ids) >= self.batch_size:
+                    await self._deliver_batch(job, user_ids)
+                    user_ids = []
+            if user_ids:
+                await self._deliver_batch(job, user_ids)
+
+            job.status = "completed"
+            await self._jobs.update_one(
+                {"_id": job.id},
+                {"$set": {"status": "completed", "finished_at": datetime.utcnow()}}
+            )
+            logger.info(f"Broadcast {job.id} completed: {dict(job.counts)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.status = "failed"
+            logger.error(f"Broadcast {job.id} failed: {str(e)}", exc_info=True)
+            await self._jobs.update_one({"_id": job.id}, {"$set": {"status": "failed", "error": str(e)}})
+        finally:
+            self._tasks.pop(job.id, None)
+
+    async def _deliver_batch(self, job: BroadcastJob, user_ids: List[int]) -> None:
+        pending = user_ids
+        if job.resumed:
+            recorded = {
+                doc["user_id"]
+                async for doc in self._recipients.find(
+                    {"job_id": job.id, "user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1}
+                )
+            }
+            job.resumed = bool(recorded)
+            pending = [user_id for user_id in user_ids if user_id not in recorded]
+        done = set(user_ids).difference(pending)
+
+        futures = {
+            self.bot.scheduler.submit(
+                {"chat_id": user_id, "text": job.text, **job.options}, Priority.BULK
+            ): user_id
+            for user_id in pending
+        }
+        if not futures:
+            # Everything was recorded before a restart
+            await self._record(job, user_ids, done, {})
+            return
+        waiting = set(futures)
+        try:
+            while waiting:
+                finished, waiting = await asyncio.wait(waiting, timeout=Config.BROADCAST_FLUSH_INTERVAL)
+                await self._record(job, user_ids, done, {
+                    futures[future]: future.exception() or future.result()
+                    for future in finished if not future.cancelled()
+                })
+        except asyncio.CancelledError:
+            # Withdraw what hasn't gone out, so the scheduler doesn't keep
+            # sending for a cancelled job, and the resumed job sends it
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+            # Keep the outcomes of sends that completed before the shutdown
+            await self._record(job, user_ids, done, {
+                futures[future]: future.exception() or future.result()
+                for future in futures
+                if future.done() and not future.cancelled() and futures[future] not in done
+            })
+            raise
+
+    async def _record(self, job: BroadcastJob, user_ids: List[int], done: set, results: Dict[int, Any]) -> None:
+        """
+        Write outcomes of finished sends, then move the checkpoint past the
+        longest prefix of the batch whose outcomes are all written.
+        :param user_ids: The batch, ordered by user id
+        :param done: Recipients of the batch already recorded, updated in place
+        :param results: Send result or exception by recipient
+        """
+        now = datetime.utcnow()
+        batch_counts = Counter()
+        records = []
+        gone = []
+        for user_id, result in results.items():
+            outcome = classify_outcome(result)
+            batch_counts[outcome] += 1
+            records.append({"job_id": job.id, "user_id": user_id, "status": outcome, "at": now})
+            if outcome in ("blocked", "deactivated"):
+                gone.append(user_id)
+
+        if records:
+            await self._recipients.insert_many(records, ordered=False)
+            done.update(results)
+        if gone:
+            await self._users.update_many({"user_id": {"$in": gone}}, {"$set": {"blocked": True}})
+
+        checkpoint: Dict[str, Any] = {"$set": {"updated_at": now}}
+        last_user_id = job.last_user_id
+        for user_id in user_ids:
+            if user_id not in done:
+                break
+            last_user_id = user_id
+        if last_user_id != job.last_user_id:
+            checkpoint["$set"]["last_user_id"] = last_user_id
+        if batch_counts:
+            checkpoint["$inc"] = {f"counts.{key}": value for key, value in batch_counts.items()}
+        if batch_counts or last_user_id != job.last_user_id:
+            await self._jobs.update_one({"_id": job.id}, checkpoint)
+        job.counts.update(batch_counts)
+        job.last_user_id = last_user_id
@@ -0,0 +1,170 @@
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger("Mitsuri.core.cooldowns")
+
+SCOPES = ("user", "chat", "user_chat", "global")
+
+
+class CooldownKey(NamedTuple):
+    """
+    What a cooldown applies to. Components the scope doesn't use are 0.
+    """
+
+    scope: str
+    user_id: int
+    chat_id: int
+    command: str
+
+    def __str__(self) -> str:
+        return f"{self.scope}:{self.user_id}:{self.chat_id}:{self.command}"
+
+
+def make_key(scope: str, command: str, user_id: int = 0, chat_id: int = 0) -> CooldownKey:
+    """
+    Build a cooldown key.
+    :param scope: user (per user, any chat), chat (per chat, any user),
+                  user_chat (per user in each chat) or global
+    :param command: Command name
+    :param user_id: Telegram user ID
+    :param chat_id: Telegram chat ID
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown cooldown scope: {scope}")
+    if scope in ("chat", "global"):
+        user_id = 0
+    if scope in ("user", "global"):
+        chat_id = 0
+    return CooldownKey(scope, user_id, chat_id, command.lower())
+
+
+class MemoryCooldownBackend:
+    """
+    In-process cooldowns. Expired keys are pruned through a heap ordered
+    by expiry, so the store only holds running cooldowns.
+    """
+
+    def __init__(self):
+        self._expiry: Dict[CooldownKey, float] = {}
+        self._heap: List[Tuple[float, CooldownKey]] = []
+
+    def _prune(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires, key = heapq.heappop(heap)
+            if self._expiry.get(key) == expires:
+                del self._expiry[key]
+
+    async def acquire(self, key: CooldownKey, seconds: float) -> float:
+        now = time.monotonic()
+        self._prune(now)
+        expires = self._expiry.get(key)
+        if expires is not None:
+            return expires - now
+        expires = now + seconds
+        self._expiry[key] = expires
+        heapq.heappush(self._heap, (expires, key))
+        return 0.0
+
+    async def remaining_many(self, keys: Iterable[CooldownKey]) -> Dict[CooldownKey, float]:
+        now = time.monotonic()
+        self._prune(now)
+        return {key: self._expiry[key] - now for key in keys if key in self._expiry}
+
+    async def reset(self, key: CooldownKey) -> None:
+        # The stale heap entry is skipped when popped
+        self._expiry.pop(key, None)
+
+
+class MongoCooldownBackend:
+    """
+    Cooldowns shared by every process using the same database.
+    One document per running cooldown, removed by the TTL index on
+    `expires_at` declared in database/indexes.py.
+    """
+
+    def __init__(self, collection):
+        """
+        :param collection: Async (motor) collection holding cooldowns
+        """
+        self.collection = collection
+
+    async def acquire(self, key: CooldownKey, seconds: float) -> float:
+        now = datetime.utcnow()
+        try:
+            # Matches only an expired document; if a live one exists the
+            # upsert collides on _id, which makes check-and-set atomic
+            await self.collection.update_one(
+                {"_id": str(key), "expires_at": {"$lte": now}},
+                {"$set": {"expires_at": now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+            return 0.0
+        except DuplicateKeyError:
+            doc = await self.collection.find_one({"_id": str(key)})
+            if doc is None:
+                # Expired and removed in between, treat as free next time
+                return 0.0
+            return max(0.0, (doc["expires_at"] - now).total_seconds())
+
+    async def remaining_many(self, keys: Iterable[CooldownKey]) -> Dict[CooldownKey, float]:
+        by_id = {str(key): key for key in keys}
+        now = datetime.utcnow()
+        cursor = self.collection.find({"_id": {"$in": list(by_id)}, "expires_at": {"$gt": now}})
+        return {
+            by_id[doc["_id"]]: (doc["expires_at"] - now).total_seconds()
+            async for doc in cursor
+        }
+
+    async def reset(self, key: CooldownKey) -> None:
+        await self.collection.delete_one({"_id": str(key)})
+
+
+class CooldownService:
+    """
+    Per-command cooldowns keyed by (scope, user, chat, command).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryCooldownBackend()
+
+    def use(self, backend) -> None:
+        """
+        Switch storage backend.
+        :param backend: MemoryCooldownBackend or MongoCooldownBackend
+        """
+        self.backend = backend
+        logger.info(f"Cooldowns stored in {backend.__class__.__name__}")
+
+    async def check(
+        self,
+        command: str,
+        seconds: float,
+        user_id: int = 0,
+        chat_id: int = 0,
+        scope: str = "user"
+    ) -> float:
+        """
+        Start a cooldown unless one is already running.
+        :return: 0 if the command may run, otherwise seconds remaining
+        """
+        return await self.backend.acquire(make_key(scope, command, user_id, chat_id), seconds)
+
+    async def remaining_many(self, keys: Iterable[CooldownKey]) -> Dict[CooldownKey, float]:
+        """
+        Look up several cooldowns at once without starting any.
+        :return: Remaining seconds for the keys that are on cooldown
+        """
+        return await self.backend.remaining_many(keys)
+
+    async def reset(self, key: CooldownKey) -> None:
+        await self.backend.reset(key)
+
+
+# Shared cooldown service
+cooldowns = CooldownService()
@@ -44,5 +44,8 @@ class DirectoryManager:
                 logger.error(f"Failed to delete file {file_path}: {e}")
 
 
-# Ensure required directories are created at startup
-DirectoryManager.ensure_directories()
+def setup_directories():
+    """
+    Create the directories the bot writes to. Run as a startup phase.
+    """
+    DirectoryManager.ensure_directories()
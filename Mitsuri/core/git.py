@@ -10,6 +10,20 @@ class GitManager:
     Provides utilities for fetching commits and pulling updates.
     """
 
+    @staticmethod
+    def is_repo():
+        """
+        Check whether the bot runs from a Git working tree.
+        :return: True if it does
+        """
+        try:
+            output = subprocess.check_output(
+                ["git", "rev-parse", "--is-inside-work-tree"], text=True, stderr=subprocess.DEVNULL
+            ).strip()
+            return output == "true"
+        except (subprocess.CalledProcessError, OSError):
+            return False
+
     @staticmethod
     def get_latest_commit():
         """
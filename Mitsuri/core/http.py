@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from ..config import Config
+
+logger = logging.getLogger("Mitsuri.core.http")
+
+# What a request through the shared client can raise
+HTTP_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class HttpClient:
+    """
+    One aiohttp session shared by every integration, so connections are
+    kept alive and reused per host instead of paying TCP and TLS setup on
+    each call. At most HTTP_PER_HOST connections are open to one host and
+    HTTP_POOL_SIZE overall; requests beyond that wait for a free
+    connection, which counts against the connect timeout. Compressed
+    responses are decoded transparently.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        The shared session, created on first use inside the running loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=Config.HTTP_POOL_SIZE,
+                limit_per_host=Config.HTTP_PER_HOST,
+                keepalive_timeout=Config.HTTP_KEEPALIVE,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout(),
+                auto_decompress=True,
+                headers={"User-Agent": f"{Config.BOT_NAME}Bot"}
+            )
+        return self._session
+
+    @staticmethod
+    def timeout(read: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """
+        :param read: Seconds to wait for data, HTTP_READ_TIMEOUT by default
+        """
+        return aiohttp.ClientTimeout(
+            total=None,
+            connect=Config.HTTP_CONNECT_TIMEOUT,
+            sock_read=read or Config.HTTP_READ_TIMEOUT
+        )
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        raise_for_status: bool = True,
+        read_timeout: Optional[float] = None
+    ) -> Any:
+        """
+        GET a URL and decode its JSON body.
+        :param url: URL
+        :param params: Query parameters
+        :param headers: Extra request headers
+        :param raise_for_status: Raise aiohttp.ClientResponseError on 4xx/5xx
+        :param read_timeout: Seconds to wait for data, HTTP_READ_TIMEOUT by default
+        :return: Decoded JSON
+        """
+        kwargs: Dict[str, Any] = {}
+        if read_timeout:
+            kwargs["timeout"] = self.timeout(read_timeout)
+        async with self.session.get(
+            url, params=params, headers=headers, raise_for_status=raise_for_status, **kwargs
+        ) as response:
+            # Some APIs send JSON as text/plain
+            return await response.json(content_type=None)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Shared HTTP client
+http_client = HttpClient()
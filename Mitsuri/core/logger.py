@@ -0,0 +1,251 @@
+import atexit
+import copy
+import logging
+import os
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Any, Deque, Dict, List, Optional
+
+from ..config import Config
+
+LOG_FORMAT = "[%(asctime)s - %(levelname)s] - %(name)s - %(message)s"
+LOG_DATE_FORMAT = "%d-%b-%y %H:%M:%S"
+
+# The running pipeline, set by setup_logging
+pipeline: Optional["LogPipeline"] = None
+
+
+def setup_logger(name: str) -> logging.Logger:
+    """
+    Get a named logger. Output goes wherever setup_logging routed the root logger.
+    :param name: Logger name
+    """
+    return logging.getLogger(name)
+
+
+class LogPipeline:
+    """
+    Moves log output off the calling thread. Records are appended to a
+    bounded buffer and a writer thread hands them to the real handlers in
+    batches, flushing each stream once per batch instead of once per record.
+    Under overload, records below WARNING are sampled once the buffer is
+    half full and dropped when it is full; WARNING and above push out the
+    oldest buffered record instead. Losses are counted and reported.
+    """
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        capacity: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        sample_every: int = 10
+    ):
+        """
+        :param handlers: Handlers the writer thread emits to
+        :param capacity: Maximum buffered records
+        :param batch_size: Records written per batch
+        :param flush_interval: Seconds the writer waits for a batch to fill
+        :param sample_every: Keep one in this many low-level records under pressure
+        """
+        self.handlers = handlers
+        self.capacity = max(1, capacity)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.sample_every = max(1, sample_every)
+        self._buffer: Deque[logging.LogRecord] = deque()
+        self._ready = threading.Condition(threading.Lock())
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._seen_under_pressure = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self._reported_drops = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, record: logging.LogRecord) -> None:
+        with self._ready:
+            size = len(self._buffer)
+            if size >= self.capacity:
+                self.dropped += 1
+                if record.levelno < logging.WARNING:
+                    return
+                # Make room by losing the oldest record instead
+                self._buffer.popleft()
+            if record.levelno < logging.WARNING and size >= self.capacity // 2:
+                self._seen_under_pressure += 1
+                if self._seen_under_pressure % self.sample_every:
+                    self.sampled_out += 1
+                    return
+            self._buffer.append(record)
+            if size + 1 >= self.batch_size:
+                self._ready.notify()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Write out everything buffered and stop the writer thread.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        with self._ready:
+            self._stopping = True
+            self._ready.notify()
+        thread.join(timeout)
+        self._thread = None
+        # Anything left if the thread didn't finish in time
+        self._drain()
+        for handler in self.handlers:
+            handler.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+        }
+
+    def _take(self) -> List[logging.LogRecord]:
+        with self._ready:
+            count = min(len(self._buffer), self.batch_size)
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _drain(self) -> None:
+        batch = self._take()
+        while batch:
+            self._write(batch)
+            batch = self._take()
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                if not self._stopping and len(self._buffer) < self.batch_size:
+                    self._ready.wait(self.flush_interval)
+                stopping = self._stopping
+            self._drain()
+            self._report_drops()
+            if stopping:
+                return
+
+    def _report_drops(self) -> None:
+        lost = self.dropped + self.sampled_out
+        if lost == self._reported_drops:
+            return
+        record = logging.LogRecord(
+            "Mitsuri.core.logger", logging.WARNING, __file__, 0,
+            "Log buffer overloaded: %d records dropped, %d sampled out so far",
+            (self.dropped, self.sampled_out), None
+        )
+        self._reported_drops = lost
+        self._write([record])
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            if isinstance(handler, logging.StreamHandler):
+                self._write_stream(handler, batch)
+            else:
+                for record in batch:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+        self.written += len(batch)
+
+    @staticmethod
+    def _write_stream(handler: logging.StreamHandler, batch: List[logging.LogRecord]) -> None:
+        rotating = isinstance(handler, RotatingFileHandler)
+        handler.acquire()
+        try:
+            for record in batch:
+                if record.levelno < handler.level or not handler.filter(record):
+                    continue
+                try:
+                    if rotating and handler.shouldRollover(record):
+                        handler.doRollover()
+                    if handler.stream is None:
+                        handler.stream = handler._open()
+                    handler.stream.write(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            handler.flush()
+        finally:
+            handler.release()
+
+
+class PipelineHandler(logging.Handler):
+    """
+    Root handler that only buffers records for the pipeline's writer thread.
+    The message is merged with its %-args and any traceback here, as
+    logging.handlers.QueueHandler does, so the writer sees args as they
+    were at the call; the handlers' own formatting happens on that thread.
+    """
+
+    def __init__(self, pipeline: LogPipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Copy of the record with the message final and no args or exc_info left.
+        """
+        message = self.format(record)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.pipeline.put(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+def setup_logging(log_file: str = "logs/mitsuri.log") -> LogPipeline:
+    """
+    Route all logging through a LogPipeline writing to a rotating file and the console.
+    :param log_file: Log file path, its directory is created if missing
+    :return: The running pipeline
+    """
+    global pipeline
+
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    handlers: List[logging.Handler] = [
+        RotatingFileHandler(log_file, maxBytes=5000000, backupCount=10),
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if pipeline is not None:
+        pipeline.stop()
+    pipeline = LogPipeline(
+        handlers,
+        capacity=Config.LOG_BUFFER_SIZE,
+        batch_size=Config.LOG_BATCH_SIZE,
+        flush_interval=Config.LOG_FLUSH_INTERVAL,
+        sample_every=Config.LOG_SAMPLE_EVERY
+    )
+    pipeline.start()
+    atexit.register(pipeline.stop)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(PipelineHandler(pipeline))
+    root.setLevel(logging.INFO)
+
+    logging.getLogger("pyrogram").setLevel(logging.WARNING)
+    logging.getLogger("motor").setLevel(logging.WARNING)
+    return pipeline
@@ -1,54 +1,91 @@
 import logging
-from pymongo import MongoClient, errors
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import errors
+
 from ..config import Config
 
 logger = logging.getLogger("Mitsuri.core.mongo")
 
+# The connected instance, shared by everything that needs the database
+_instance: Optional["MongoDB"] = None
+
 
 class MongoDB:
     """
-    MongoDB Connector for Mitsuri Bot.
-    Provides a singleton connection to the database and utility methods.
+    Async MongoDB connector for Mitsuri Bot, built on motor.
+    One client (and so one connection pool) is shared by the whole process;
+    nothing connects until `initialize` is awaited.
     """
 
-    def __init__(self):
-        self.client = None
-        self.db = None
+    def __init__(self, uri: str, db_name: Optional[str] = None):
+        """
+        :param uri: MongoDB connection string
+        :param db_name: Database name, Config.MONGO_DB_NAME by default
+        """
+        self.uri = uri
+        self.db_name = db_name or Config.MONGO_DB_NAME
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.db: Optional[AsyncIOMotorDatabase] = None
 
-    def connect(self):
+    async def initialize(self) -> None:
         """
-        Establish connection to the MongoDB database.
+        Connect and verify the server is reachable.
         """
+        global _instance
+
         try:
-            logger.info("Connecting to MongoDB...")
-            self.client = MongoClient(Config.DATABASE_URI, serverSelectionTimeoutMS=5000)
-            self.client.server_info()  # Trigger connection test
-            self.db = self.client["mitsuri_db"]  # Database name
+            self.client = AsyncIOMotorClient(
+                self.uri,
+                maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=60000,
+                serverSelectionTimeoutMS=5000,
+                connectTimeoutMS=5000,
+                retryWrites=True
+            )
+            await self.client.admin.command("ping")
+            self.db = self.client[self.db_name]
+            _instance = self
             logger.info("MongoDB connection established.")
-        except errors.ServerSelectionTimeoutError as e:
+        except errors.PyMongoError as e:
             logger.error(f"MongoDB connection failed: {e}")
             raise ConnectionError("Could not connect to MongoDB.")
 
-    def get_collection(self, name: str):
+    def get_database(self) -> AsyncIOMotorDatabase:
+        if self.db is None:
+            raise ConnectionError("No active MongoDB connection.")
+        return self.db
+
+    def get_collection(self, name: str) -> AsyncIOMotorCollection:
         """
         Retrieve a specific collection from the database.
         :param name: Collection name
-        :return: MongoDB Collection object
+        :return: Motor collection
         """
-        if not self.db:
-            raise ConnectionError("No active MongoDB connection.")
-        return self.db[name]
+        return self.get_database()[name]
 
-    def close(self):
+    def close(self) -> None:
         """
         Safely close the MongoDB connection.
         """
+        global _instance
+
         if self.client:
             logger.info("Closing MongoDB connection...")
             self.client.close()
+            self.client = None
+            self.db = None
+            if _instance is self:
+                _instance = None
             logger.info("MongoDB connection closed.")
 
 
-# Singleton instance of MongoDB
-mongodb = MongoDB()
-mongodb.connect()
+def get_database() -> AsyncIOMotorDatabase:
+    """
+    Database of the connected MongoDB instance.
+    """
+    if _instance is None:
+        raise ConnectionError("No active MongoDB connection.")
+    return _instance.get_database()
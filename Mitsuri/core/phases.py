@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("Mitsuri.core.phases")
+
+
+class Phase:
+    """
+    One step of startup and the phases it must wait for.
+    """
+
+    __slots__ = ("name", "func", "after", "status", "started", "finished")
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[None]], after: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.status = "pending"
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class PhaseGraph:
+    """
+    Startup as a dependency graph. Every phase starts as soon as the
+    phases it depends on have finished, so independent phases (connecting
+    to MongoDB and to Telegram, say) overlap. If a phase fails, the phases
+    depending on it are skipped, the others are cancelled, and the error
+    is raised once everything has stopped.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Phase] = {}
+        self._origin = 0.0
+        self._total = 0.0
+
+    def add(self, name: str, func: Callable[[], Awaitable[None]], after: Iterable[str] = ()) -> None:
+        """
+        Add a phase.
+        :param name: Unique phase name
+        :param func: Coroutine function running the phase
+        :param after: Names of the phases it depends on
+        """
+        if name in self.phases:
+            raise ValueError(f"Duplicate startup phase: {name}")
+        self.phases[name] = Phase(name, func, after)
+
+    def _check(self) -> None:
+        for phase in self.phases.values():
+            for dependency in phase.after:
+                if dependency not in self.phases:
+                    raise ValueError(f"Startup phase {phase.name} depends on unknown phase {dependency}")
+
+        # Depth-first search for cycles
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == 1:
+                raise ValueError(f"Startup phases form a cycle: {' -> '.join(path + [name])}")
+            if state.get(name) == 2:
+                return
+            state[name] = 1
+            for dependency in self.phases[name].after:
+                visit(dependency, path + [name])
+            state[name] = 2
+
+        for name in self.phases:
+            visit(name, [])
+
+    async def _run_phase(self, phase: Phase, tasks: Dict[str, asyncio.Task]) -> None:
+        try:
+            await asyncio.gather(*(tasks[dependency] for dependency in phase.after))
+        except BaseException:
+            phase.status = "skipped"
+            raise
+        phase.started = time.perf_counter()
+        try:
+            await phase.func()
+        except asyncio.CancelledError:
+            phase.status = "cancelled"
+            raise
+        except BaseException:
+            phase.status = "failed"
+            raise
+        else:
+            phase.status = "ok"
+        finally:
+            phase.finished = time.perf_counter()
+
+    async def run(self) -> None:
+        """
+        Run every phase, then log the timing table.
+        """
+        self._check()
+        self._origin = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        for phase in self.phases.values():
+            tasks[phase.name] = asyncio.ensure_future(self._run_phase(phase, tasks))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for phase in self.phases.values():
+                if phase.status == "pending":
+                    phase.status = "cancelled"
+            raise
+        finally:
+            self._total = time.perf_counter() - self._origin
+            logger.info(self.report())
+
+    def report(self) -> str:
+        """
+        Timing table: when each phase started relative to the start of
+        the graph, how long it took and how it ended.
+        """
+        width = max([len(name) for name in self.phases] + [5])
+        lines = [
+            f"Startup phases ({self._total:.3f}s):",
+            f"  {'phase':<{width}}  {'start':>8}  {'took':>8}  status",
+        ]
+        ordered = sorted(
+            self.phases.values(),
+            key=lambda phase: phase.started if phase.started is not None else float("inf")
+        )
+        for phase in ordered:
+            start = f"{phase.started - self._origin:.3f}s" if phase.started is not None else "-"
+            took = f"{phase.duration:.3f}s" if phase.started is not None else "-"
+            lines.append(f"  {phase.name:<{width}}  {start:>8}  {took:>8}  {phase.status}")
+        return "\n".join(lines)
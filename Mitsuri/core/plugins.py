@@ -0,0 +1,349 @@
+import ast
+import asyncio
+import importlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pyrogram import Client, ContinuePropagation, filters
+from pyrogram.handlers import CallbackQueryHandler, MessageHandler
+from pyrogram.handlers.handler import Handler
+
+from ..config import Config
+from .blacklist import atomic_write_json
+
+logger = logging.getLogger("Mitsuri.core.plugins")
+
+INDEX_VERSION = 1
+# Client decorators the index understands; any other one makes its module eager
+HANDLER_KINDS = {"on_message": "message", "on_callback_query": "callback"}
+
+
+def _literal(node: ast.AST) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def _argument(call: ast.Call, position: int, name: str) -> Optional[ast.AST]:
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return call.args[position] if len(call.args) > position else None
+
+
+def _and_terms(node: ast.AST) -> List[ast.AST]:
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        return _and_terms(node.left) + _and_terms(node.right)
+    return [node]
+
+
+def _key_filter(node: Optional[ast.AST]) -> Optional[Dict[str, Any]]:
+    """
+    The filters.command or filters.regex every update must pass for the
+    filter expression to match, i.e. one of the terms of a top-level AND.
+    :return: The key, or None if the expression has none we can read
+    """
+    if node is None:
+        return None
+    for term in _and_terms(node):
+        if not (
+            isinstance(term, ast.Call)
+            and isinstance(term.func, ast.Attribute)
+            and isinstance(term.func.value, ast.Name)
+            and term.func.value.id == "filters"
+        ):
+            continue
+        if term.func.attr == "command":
+            names = _literal(_argument(term, 0, "commands"))
+            names = [names] if isinstance(names, str) else names
+            prefixes_node = _argument(term, 1, "prefixes")
+            prefixes = "/" if prefixes_node is None else _literal(prefixes_node)
+            prefixes = [prefixes] if isinstance(prefixes, str) else prefixes
+            case_node = _argument(term, 2, "case_sensitive")
+            case_sensitive = False if case_node is None else _literal(case_node)
+            if (
+                isinstance(names, (list, tuple)) and names and all(isinstance(n, str) for n in names)
+                and isinstance(prefixes, (list, tuple)) and all(isinstance(p, str) for p in prefixes)
+                and isinstance(case_sensitive, bool)
+            ):
+                return {
+                    "commands": list(names),
+                    "prefixes": list(prefixes),
+                    "case_sensitive": case_sensitive
+                }
+            return None
+        if term.func.attr == "regex":
+            pattern = _literal(_argument(term, 0, "pattern"))
+            if isinstance(pattern, str) and _argument(term, 1, "flags") is None:
+                return {"pattern": pattern}
+            return None
+    return None
+
+
+def _description(function: ast.AST) -> Optional[str]:
+    """
+    Command description from a handler docstring: its first line that
+    isn't the "/command command handler." heading.
+    """
+    docstring = ast.get_docstring(function) if isinstance(function, ast.AsyncFunctionDef) else None
+    for line in (docstring or "").splitlines():
+        line = line.strip()
+        if line and not line.endswith("command handler."):
+            return line.rstrip(".")
+    return None
+
+
+def scan_plugin(path: str) -> Dict[str, Any]:
+    """
+    Read a plugin's handlers from its source, without importing it.
+    A module registering anything the index can't describe, such as a
+    handler without a literal command or callback pattern, is eager.
+    :param path: Plugin file
+    :return: {"eager": bool, "handlers": [...]}
+    """
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    decorators = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in node.decorator_list:
+                decorators[id(decorator)] = node
+
+    handlers = []
+    for node in ast.walk(tree):
+        if not (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == "Client"
+            and node.func.attr.startswith("on_")
+        ):
+            continue
+        kind = HANDLER_KINDS.get(node.func.attr)
+        key = _key_filter(_argument(node, 0, "filters"))
+        group_node = _argument(node, 1, "group")
+        group = 0 if group_node is None else _literal(group_node)
+        if kind is None or key is None or not isinstance(group, int) or id(node) not in decorators:
+            return {"eager": True, "handlers": []}
+        if kind == "callback" and "pattern" not in key:
+            return {"eager": True, "handlers": []}
+        handler = {"kind": kind, "group": group, **key}
+        if "commands" in key:
+            handler["description"] = _description(decorators[id(node)])
+        handlers.append(handler)
+
+    return {"eager": not handlers, "handlers": handlers}
+
+
+def build_index(root: str, index_file: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Index every plugin module under a package. Entries are reused from
+    the index file while the plugin's size and mtime are unchanged, so
+    only edited plugins are parsed again.
+    :param root: Plugins package, e.g. Mitsuri.plugins
+    :param index_file: Where the index is cached, none if not given
+    :return: Module name to scan_plugin entry, in load order
+    """
+    spec = importlib.util.find_spec(root)
+    if spec is None or not spec.submodule_search_locations:
+        raise ImportError(f"Plugin package not found: {root}")
+    root_dir = list(spec.submodule_search_locations)[0]
+
+    cached: Dict[str, Any] = {}
+    if index_file and os.path.isfile(index_file):
+        try:
+            with open(index_file) as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("root") == root:
+                cached = data.get("plugins", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable plugin index {index_file}: {e}")
+
+    plugins: Dict[str, Any] = {}
+    index: Dict[str, Dict[str, Any]] = {}
+    for directory, subdirectories, files in os.walk(root_dir):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith(("_", ".")))
+        for file in sorted(files):
+            if not file.endswith(".py") or file == "__init__.py":
+                continue
+            path = os.path.join(directory, file)
+            relative = os.path.relpath(path, root_dir)
+            module = ".".join([root] + relative[:-3].split(os.sep))
+            stat = os.stat(path)
+            entry = cached.get(relative)
+            if not entry or entry.get("mtime") != stat.st_mtime_ns or entry.get("size") != stat.st_size:
+                try:
+                    scanned = scan_plugin(path)
+                except (OSError, SyntaxError, ValueError) as e:
+                    logger.warning(f"Could not index plugin {module}: {e}")
+                    scanned = {"eager": True, "handlers": []}
+                entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, **scanned}
+            plugins[relative] = entry
+            index[module] = entry
+
+    if index_file and plugins != cached:
+        try:
+            atomic_write_json(index_file, {"version": INDEX_VERSION, "root": root, "plugins": plugins})
+        except OSError as e:
+            logger.warning(f"Could not save plugin index {index_file}: {e}")
+    return index
+
+
+def module_handlers(module) -> List[Tuple[Handler, int]]:
+    """
+    Handlers a plugin module declared with the Client decorators,
+    collected the same way Pyrogram's smart plugins are.
+    """
+    handlers = []
+    for name in vars(module).keys():
+        try:
+            for handler, group in getattr(module, name).handlers:
+                if isinstance(handler, Handler) and isinstance(group, int):
+                    handlers.append((handler, group))
+        except Exception:
+            pass
+    return handlers
+
+
+class PluginLoader:
+    """
+    Loads plugins on first use. Instead of importing every plugin at
+    startup, a stub handler is registered per plugin from the index: a
+    command filter for its commands, a regex for its callback patterns.
+    The first update a stub matches imports the plugin, swaps the stubs
+    for the real handlers and hands the update to them. Plugins the
+    index can't describe are imported at startup as before.
+    """
+
+    def __init__(self, client: Client, root: str = "Mitsuri.plugins", index_file: Optional[str] = None):
+        """
+        :param client: Client the handlers are added to
+        :param root: Plugins package
+        :param index_file: Where the index is cached, Config.PLUGIN_INDEX_FILE by default
+        """
+        self.client = client
+        self.root = root
+        self.index_file = index_file or Config.PLUGIN_INDEX_FILE
+        self.index: Dict[str, Dict[str, Any]] = {}
+        self._handlers: Dict[str, List[Tuple[Handler, int]]] = {}
+        self._stubs: Dict[str, List[Tuple[Handler, int]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._started = False
+
+    def _disabled(self, module: str) -> bool:
+        name = module[len(self.root) + 1:]
+        return name in Config.DISABLED_PLUGINS or name.rsplit(".", 1)[-1] in Config.DISABLED_PLUGINS
+
+    def load(self, lazy: Optional[bool] = None) -> None:
+        """
+        Register every enabled plugin, as stubs where possible.
+        Must run in the client's event loop; calling it again does nothing.
+        :param lazy: Defer imports, Config.LAZY_PLUGINS by default
+        """
+        if self._started:
+            return
+        self._started = True
+        lazy = Config.LAZY_PLUGINS if lazy is None else lazy
+        self.index = build_index(self.root, self.index_file)
+
+        for module, entry in self.index.items():
+            if self._disabled(module):
+                logger.info(f"Skipping disabled plugin: {module}")
+                continue
+            for handler in entry["handlers"]:
+                for command in handler.get("commands", []):
+                    Config.register_command(command, handler.get("description") or "")
+            if lazy and not entry["eager"]:
+                self._register_stubs(module, entry["handlers"])
+            else:
+                try:
+                    self._add(module, importlib.import_module(module))
+                except Exception as e:
+                    logger.error(f"Failed to load plugin {module}: {e}")
+
+        logger.info(
+            f"Plugins: {len(self._handlers)} loaded, {len(self._stubs)} deferred "
+            f"({len(self.index)} indexed)"
+        )
+
+    def _register_stubs(self, module: str, handlers: List[Dict[str, Any]]) -> None:
+        commands: Dict[Tuple, List[str]] = {}
+        patterns: Dict[Tuple, List[str]] = {}
+        for handler in handlers:
+            if "commands" in handler:
+                key = (handler["kind"], handler["group"], tuple(handler["prefixes"]), handler["case_sensitive"])
+                commands.setdefault(key, []).extend(handler["commands"])
+            else:
+                patterns.setdefault((handler["kind"], handler["group"]), []).append(handler["pattern"])
+
+        stubs = []
+        for (kind, group, prefixes, case_sensitive), names in commands.items():
+            stub_filter = filters.command(names, prefixes=list(prefixes), case_sensitive=case_sensitive)
+            stubs.append((MessageHandler(self._stub(module, MessageHandler, group), stub_filter), group))
+        for (kind, group), regexes in patterns.items():
+            stub_filter = filters.regex("|".join(f"(?:{pattern})" for pattern in regexes))
+            handler_type = MessageHandler if kind == "message" else CallbackQueryHandler
+            stubs.append((handler_type(self._stub(module, handler_type, group), stub_filter), group))
+
+        for handler, group in stubs:
+            self.client.add_handler(handler, group)
+        self._stubs[module] = stubs
+
+    def _add(self, module: str, imported) -> List[Tuple[Handler, int]]:
+        handlers = module_handlers(imported)
+        for handler, group in handlers:
+            self.client.add_handler(handler, group)
+        # Added after the real handlers, so no update falls between the two
+        for handler, group in self._stubs.pop(module, []):
+            self.client.remove_handler(handler, group)
+        self._handlers[module] = handlers
+        logger.info(f"Loaded plugin {module} ({len(handlers)} handlers)")
+        return handlers
+
+    async def ensure_loaded(self, module: str) -> List[Tuple[Handler, int]]:
+        """
+        Import a deferred plugin, once, and register its handlers.
+        :return: The plugin's handlers, empty if it failed to import
+        """
+        if module in self._handlers:
+            return self._handlers[module]
+        lock = self._locks.setdefault(module, asyncio.Lock())
+        async with lock:
+            if module not in self._handlers:
+                loop = asyncio.get_event_loop()
+                try:
+                    # Heavy imports run off the event loop
+                    imported = await loop.run_in_executor(None, importlib.import_module, module)
+                    self._add(module, imported)
+                except Exception as e:
+                    logger.error(f"Failed to load plugin {module}: {e}")
+                    for handler, group in self._stubs.pop(module, []):
+                        self.client.remove_handler(handler, group)
+                    self._handlers[module] = []
+        return self._handlers[module]
+
+    def _stub(self, module: str, handler_type: type, group: int):
+        async def stub(client: Client, update) -> None:
+            for handler, handler_group in await self.ensure_loaded(module):
+                if handler_group != group or not isinstance(handler, handler_type):
+                    continue
+                if not await handler.check(client, update):
+                    continue
+                if inspect.iscoroutinefunction(handler.callback):
+                    await handler.callback(client, update)
+                else:
+                    await client.loop.run_in_executor(client.executor, handler.callback, client, update)
+                return
+            # None of the plugin's handlers wanted it; let the rest of the group try
+            raise ContinuePropagation
+
+        return stub
+
+    def stats(self) -> Dict[str, int]:
+        return {"indexed": len(self.index), "loaded": len(self._handlers), "deferred": len(self._stubs)}
@@ -0,0 +1,486 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from pyrogram.errors import FloodWait
+
+from ..config import Config
+from ..utils.formatters import MAX_MESSAGE_LENGTH, split_text
+
+logger = logging.getLogger("Mitsuri.core.scheduler")
+
+ChatId = Union[int, str]
+SendFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+# (payload, future, coalesce)
+Pending = Tuple[Dict[str, Any], asyncio.Future, bool]
+
+
+class Priority(IntEnum):
+    """
+    Outbound priority classes, lower values are served first.
+    """
+
+    INTERACTIVE = 0  # replies to users
+    ADMIN = 1  # moderation and admin actions
+    BULK = 2  # broadcasts and announcements
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second,
+    holding at most `capacity` tokens.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self) -> float:
+        """
+        Seconds until a token is available.
+        :return: 0 if a token can be taken right now
+        """
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """
+        Take one token. Callers check `delay()` first.
+        """
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def reserve(self) -> float:
+        """
+        Take one token, borrowing against future refills if needed.
+        :return: Seconds the caller must wait before using the token
+        """
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self) -> None:
+        """
+        Give back a token taken but not used.
+        """
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def time_to_full(self) -> float:
+        """
+        Seconds until the bucket is back at capacity.
+        """
+        self._refill(time.monotonic())
+        return max(0.0, (self.capacity - self.tokens) / self.rate)
+
+
+class ChatLane:
+    """
+    Pending outbound payloads and the rate-limit bucket for one chat.
+    """
+
+    __slots__ = ("chat_id", "bucket", "pending", "scheduled", "parked_until", "queued", "ticket")
+
+    def __init__(self, chat_id: ChatId, bucket: TokenBucket):
+        self.chat_id = chat_id
+        self.bucket = bucket
+        # One FIFO per priority class
+        self.pending: Tuple[Deque[Pending], ...] = tuple(deque() for _ in Priority)
+        # True while the lane sits in the ready queue, waits for a token
+        # or is being served by a sender, so it is never scheduled twice
+        self.scheduled = False
+        # Monotonic time until which Telegram asked us not to write here
+        self.parked_until = 0.0
+        # Priority the lane currently waits at in the ready queue (None when
+        # it isn't in it) and the ticket of its live ready-queue entry; older
+        # entries left behind by a promotion are skipped
+        self.queued: Optional[Priority] = None
+        self.ticket = 0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.pending)
+
+    def top_priority(self) -> Optional[Priority]:
+        for priority in Priority:
+            if self.pending[priority]:
+                return priority
+        return None
+
+    def drop_cancelled(self) -> None:
+        """
+        Discard payloads whose caller gave up on them before they went out.
+        """
+        for queue in self.pending:
+            while queue and queue[0][1].cancelled():
+                queue.popleft()
+
+
+class ReadyQueue:
+    """
+    Lanes ready to send, one FIFO per priority class.
+    Classes are picked by smooth weighted round robin, so lower classes
+    still progress but mostly use capacity the higher ones leave unused.
+    """
+
+    def __init__(self, weights: List[int]):
+        self._queues: Tuple[Deque[Tuple[ChatId, int]], ...] = tuple(deque() for _ in Priority)
+        self._weights = weights
+        self._credit = [0] * len(self._queues)
+        # Counts queued entries so getters sleep until there is something to take
+        self._items = asyncio.Semaphore(0)
+
+    def put(self, entry: Tuple[ChatId, int], priority: Priority) -> None:
+        self._queues[priority].append(entry)
+        self._items.release()
+
+    async def get(self) -> Tuple[ChatId, int]:
+        await self._items.acquire()
+        return self._queues[self._pick()].popleft()
+
+    def _pick(self) -> int:
+        best = -1
+        total = 0
+        for index, queue in enumerate(self._queues):
+            if not queue:
+                continue
+            self._credit[index] += self._weights[index]
+            total += self._weights[index]
+            if best < 0 or self._credit[index] > self._credit[best]:
+                best = index
+        self._credit[best] -= total
+        return best
+
+
+def _is_group(chat_id: ChatId) -> bool:
+    # Usernames can't be classified up front, treat them like groups
+    # so they get the stricter limit
+    return not isinstance(chat_id, int) or chat_id < 0
+
+
+def _mergeable(base: Dict[str, Any], payload: Dict[str, Any]) -> bool:
+    """
+    Whether two payloads can go out as one message: plain texts sent with
+    the same options (parse mode, link previews, ...).
+    """
+    if base.get("reply_markup") or base.get("reply_to_message_id"):
+        return False
+    if len(base) != len(payload):
+        return False
+    return all(
+        key == "text" or (key in payload and payload[key] == value)
+        for key, value in base.items()
+    )
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    # Fire-and-forget callers never await their future; mark failures as
+    # retrieved so asyncio doesn't warn about them (they're logged on send)
+    if not future.cancelled():
+        future.exception()
+
+
+class SendScheduler:
+    """
+    Outbound message scheduler.
+    Keeps one token bucket per chat plus a global bucket and serves
+    ready chats with a pool of sender coroutines, so independent chats
+    are sent in parallel up to Telegram's limits. Ready chats are served
+    by priority class (see ReadyQueue). Payloads submitted with `coalesce`
+    are merged with the ones queued right behind them for the same chat.
+    A FloodWait parks only
+    the chat it was raised for, unless several chats flood at once, in
+    which case the global lane is parked instead.
+    """
+
+    def __init__(self, send_func: SendFunc, workers: Optional[int] = None):
+        """
+        :param send_func: Coroutine function delivering a single payload
+        :param workers: Number of sender coroutines
+        """
+        self._send = send_func
+        self.workers = workers or Config.SENDER_WORKERS
+        self.global_bucket = TokenBucket(Config.GLOBAL_SEND_RATE, Config.GLOBAL_SEND_BURST)
+        self._lanes: Dict[ChatId, ChatLane] = {}
+        self._ready = ReadyQueue(Config.SEND_PRIORITY_WEIGHTS)
+        self._tasks: List[asyncio.Task] = []
+        self.coalesced = 0
+
+        self._global_parked_until = 0.0
+        self._flood_hits: Deque[Tuple[float, ChatId]] = deque()
+        self.flood_stats = {
+            "chat_floods": 0,
+            "global_floods": 0,
+            "wait_seconds": 0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """
+        Spawn the sender pool.
+        """
+        if self._tasks:
+            return
+        loop = asyncio.get_event_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Send scheduler started with {self.workers} senders")
+
+    async def stop(self) -> None:
+        """
+        Stop the sender pool and cancel everything still pending.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        dropped = 0
+        for lane in self._lanes.values():
+            for queue in lane.pending:
+                while queue:
+                    _, future, _ = queue.popleft()
+                    future.cancel()
+                    dropped += 1
+        self._lanes.clear()
+        if dropped:
+            logger.warning(f"Send scheduler stopped with {dropped} unsent messages")
+
+    def submit(
+        self,
+        payload: Dict[str, Any],
+        priority: Priority = Priority.INTERACTIVE,
+        coalesce: bool = False
+    ) -> asyncio.Future:
+        """
+        Queue a payload for delivery.
+        :param payload: `send_message` keyword arguments, including `chat_id`
+        :param priority: Priority class of the message
+        :param coalesce: Allow merging with neighbouring texts for the same chat
+        :return: Future resolved with the send result
+        """
+        future = asyncio.get_event_loop().create_future()
+        future.add_done_callback(_retrieve)
+
+        lane = self._lane(payload["chat_id"])
+        queue = lane.pending[priority]
+        if coalesce and len(payload["text"]) > MAX_MESSAGE_LENGTH:
+            # Oversized texts go out as several messages, the future
+            # follows the last one
+            parts = split_text(payload["text"])
+            for part in parts[:-1]:
+                queue.append(({**payload, "text": part}, self._detached(), True))
+            payload = {**payload, "text": parts[-1]}
+        queue.append((payload, future, coalesce))
+
+        if not lane.scheduled:
+            lane.scheduled = True
+            if coalesce:
+                # Linger briefly so a burst of notices leaves as one message
+                asyncio.get_event_loop().call_later(Config.COALESCE_DELAY, self._wake, lane)
+            else:
+                self._wake(lane)
+        elif lane.queued is not None and priority < lane.queued:
+            # Already waiting in a lower class, move it up
+            self._enqueue(lane)
+        return future
+
+    @staticmethod
+    def _detached() -> asyncio.Future:
+        future = asyncio.get_event_loop().create_future()
+        future.add_done_callback(_retrieve)
+        return future
+
+    def pending_count(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue depth and flood pressure.
+        """
+        now = time.monotonic()
+        return {
+            "pending": self.pending_count(),
+            "chats": len(self._lanes),
+            "parked_chats": sum(1 for lane in self._lanes.values() if lane.parked_until > now),
+            "global_parked_for": max(0.0, self._global_parked_until - now),
+            "coalesced": self.coalesced,
+            **self.flood_stats,
+        }
+
+    def _lane(self, chat_id: ChatId) -> ChatLane:
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            if _is_group(chat_id):
+                bucket = TokenBucket(Config.GROUP_SEND_RATE, Config.GROUP_SEND_BURST)
+            else:
+                bucket = TokenBucket(Config.PRIVATE_SEND_RATE, Config.PRIVATE_SEND_BURST)
+            lane = self._lanes[chat_id] = ChatLane(chat_id, bucket)
+        return lane
+
+    def _blocked_for(self, lane: ChatLane) -> float:
+        """
+        Seconds before a lane may send, from its bucket or a FloodWait park.
+        """
+        now = time.monotonic()
+        return max(
+            lane.bucket.delay(),
+            lane.parked_until - now,
+            self._global_parked_until - now,
+        )
+
+    def _wake(self, lane: ChatLane) -> None:
+        """
+        Put a lane in the ready queue as soon as it is allowed to send.
+        """
+        delay = self._blocked_for(lane)
+        if delay > 0:
+            asyncio.get_event_loop().call_later(delay, self._enqueue, lane)
+        else:
+            self._enqueue(lane)
+
+    def _enqueue(self, lane: ChatLane) -> None:
+        priority = lane.top_priority()
+        if priority is None:
+            self._release(lane)
+            return
+        lane.ticket += 1
+        lane.queued = priority
+        self._ready.put((lane.chat_id, lane.ticket), priority)
+
+    def _release(self, lane: ChatLane) -> None:
+        """
+        Hand a lane back after a send: reschedule it or let it go idle.
+        """
+        lane.drop_cancelled()
+        if len(lane):
+            self._wake(lane)
+            return
+        lane.scheduled = False
+        # Keep the bucket around until it has refilled, otherwise a new
+        # lane would grant a fresh burst to a chat we just served
+        asyncio.get_event_loop().call_later(
+            lane.bucket.time_to_full(), self._evict, lane.chat_id
+        )
+
+    def _evict(self, chat_id: ChatId) -> None:
+        lane = self._lanes.get(chat_id)
+        if lane is not None and not lane.scheduled and not len(lane):
+            del self._lanes[chat_id]
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, ticket = await self._ready.get()
+            lane = self._lanes.get(chat_id)
+            if lane is None or lane.ticket != ticket:
+                continue
+            lane.queued = None
+
+            lane.drop_cancelled()
+            if not len(lane):
+                self._release(lane)
+                continue
+
+            # A token may have been taken or a park set since the lane was woken
+            if self._blocked_for(lane) > 0:
+                self._wake(lane)
+                continue
+            lane.bucket.consume()
+
+            wait = self.global_bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            # Re-check: a higher class may have arrived while waiting on the global bucket
+            lane.drop_cancelled()
+            priority = lane.top_priority()
+            if priority is None:
+                self.global_bucket.refund()
+                self._release(lane)
+                continue
+            queue = lane.pending[priority]
+            batch = [queue.popleft()]
+            payload = self._coalesce(queue, batch) if batch[0][2] else batch[0][0]
+            try:
+                result = await self._send(dict(payload))
+            except asyncio.CancelledError:
+                queue.extendleft(reversed(batch))
+                raise
+            except FloodWait as e:
+                # Retry after exactly the server-specified wait, in order
+                queue.extendleft(reversed(batch))
+                self._on_flood(lane, e.value)
+            except Exception as e:
+                logger.debug(f"Error delivering message to {chat_id}: {str(e)}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_result(result)
+
+            self._release(lane)
+
+    def _coalesce(self, queue: Deque[Pending], batch: List[Pending]) -> Dict[str, Any]:
+        """
+        Pull the coalescible payloads queued behind `batch[0]` into `batch`.
+        :return: Payload carrying the merged text
+        """
+        base = batch[0][0]
+        size = len(base["text"])
+        while queue:
+            payload, future, coalesce = queue[0]
+            if future.cancelled():
+                queue.popleft()
+                continue
+            if not coalesce or not _mergeable(base, payload):
+                break
+            size += 1 + len(payload["text"])
+            if size > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(queue.popleft())
+
+        if len(batch) == 1:
+            return base
+        self.coalesced += len(batch) - 1
+        return {**base, "text": "\n".join(payload["text"] for payload, _, _ in batch)}
+
+    def _on_flood(self, lane: ChatLane, seconds: int) -> None:
+        """
+        Park a chat for a FloodWait and detect floods hitting many chats.
+        :param lane: Lane the FloodWait was raised for
+        :param seconds: Wait requested by Telegram
+        """
+        now = time.monotonic()
+        lane.parked_until = max(lane.parked_until, now + seconds)
+        self.flood_stats["chat_floods"] += 1
+        self.flood_stats["wait_seconds"] += seconds
+        logger.info(f"FloodWait of {seconds}s for chat {lane.chat_id}, parking it")
+
+        hits = self._flood_hits
+        hits.append((now, lane.chat_id))
+        while hits and now - hits[0][0] > Config.FLOOD_GLOBAL_WINDOW:
+            hits.popleft()
+        if len({chat_id for _, chat_id in hits}) >= Config.FLOOD_GLOBAL_CHATS:
+            hits.clear()
+            self._global_parked_until = max(self._global_parked_until, now + seconds)
+            self.flood_stats["global_floods"] += 1
+            logger.warning(f"FloodWait across several chats, pausing all sends for {seconds}s")
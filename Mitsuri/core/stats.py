@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from ..config import Config
+from ..database.indexes import IndexSpec, register_index
+from .mongo import get_database
+
+logger = logging.getLogger("Mitsuri.core.stats")
+
+COLLECTION = "stats_buckets"
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+register_index(IndexSpec(COLLECTION, "kind_start", [("kind", ASCENDING), ("start", ASCENDING)]))
+register_index(IndexSpec(COLLECTION, "expires_at_ttl", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}))
+
+
+def _floor(moment: datetime, unit: timedelta) -> datetime:
+    if unit == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def _ceil(moment: datetime, unit: timedelta) -> datetime:
+    floored = _floor(moment, unit)
+    return floored if floored == moment else floored + unit
+
+
+class StatsRecorder:
+    """
+    Bot counters. `incr` only bumps an in-process counter; every
+    `interval` seconds the accumulated deltas are added with $inc to the
+    current minute and hour bucket documents. Several processes can record
+    into the same buckets, and a crash loses at most one interval of counts.
+    Minute buckets are kept for STATS_MINUTE_DAYS, hour buckets for
+    STATS_HOUR_DAYS.
+    """
+
+    def __init__(self, interval: float = 10):
+        """
+        :param interval: Seconds between flushes
+        """
+        self.interval = interval
+        # Counts since this process started
+        self.totals: Counter = Counter()
+        # Counts not yet written, per minute they happened in
+        self._pending: Dict[datetime, Counter] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """
+        Count an event.
+        :param name: Counter name, e.g. messages
+        :param amount: Increment
+        """
+        self.totals[name] += amount
+        minute = _floor(datetime.utcnow(), MINUTE)
+        pending = self._pending.get(minute)
+        if pending is None:
+            pending = self._pending[minute] = Counter()
+        pending[name] += amount
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def _operations(self, pending: Dict[datetime, Counter]) -> List[UpdateOne]:
+        minute_keep = timedelta(days=Config.STATS_MINUTE_DAYS)
+        hour_keep = timedelta(days=Config.STATS_HOUR_DAYS)
+        buckets: Dict[Tuple[str, datetime], Counter] = {}
+        for minute, counts in pending.items():
+            for kind, start in (("minute", minute), ("hour", _floor(minute, HOUR))):
+                buckets.setdefault((kind, start), Counter()).update(counts)
+
+        operations = []
+        for (kind, start), counts in buckets.items():
+            keep = minute_keep if kind == "minute" else hour_keep
+            operations.append(UpdateOne(
+                {"_id": f"{kind}:{start:%Y%m%d%H%M}"},
+                {
+                    "$inc": {f"counts.{name}": value for name, value in counts.items()},
+                    "$setOnInsert": {"kind": kind, "start": start, "expires_at": start + keep},
+                },
+                upsert=True
+            ))
+        return operations
+
+    async def flush(self) -> None:
+        """
+        Write the counts accumulated since the last flush.
+        """
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = {}
+        try:
+            await get_database()[COLLECTION].bulk_write(self._operations(pending), ordered=False)
+        except Exception as e:
+            # Keep the deltas for the next attempt
+            for minute, counts in pending.items():
+                self._pending.setdefault(minute, Counter()).update(counts)
+            logger.error(f"Error flushing stats: {str(e)}")
+
+    async def _sum(self, kind: str, start: datetime, end: datetime, totals: Counter) -> None:
+        if start >= end:
+            return
+        cursor = get_database()[COLLECTION].find(
+            {"kind": kind, "start": {"$gte": start, "$lt": end}}, {"counts": 1}
+        )
+        async for doc in cursor:
+            totals.update(doc.get("counts", {}))
+
+    @staticmethod
+    def _bounds(since: datetime, until: datetime) -> Tuple[datetime, datetime]:
+        """
+        Window rounded out to the buckets that can answer it: minutes, or
+        whole hours for an edge older than the minute buckets' retention.
+        """
+        since = _floor(since, MINUTE)
+        until = _ceil(until, MINUTE)
+        # Minute buckets past STATS_MINUTE_DAYS have expired; reading them
+        # would silently undercount the oldest part of the window
+        minute_horizon = datetime.utcnow() - timedelta(days=Config.STATS_MINUTE_DAYS)
+        if since < minute_horizon:
+            since = _floor(since, HOUR)
+        if until < minute_horizon:
+            until = _ceil(until, HOUR)
+        return since, until
+
+    async def totals_between(self, since: datetime, until: Optional[datetime] = None) -> Counter:
+        """
+        Counts recorded between two UTC times, to the minute. Whole hours
+        are read from hour buckets, the partial hours at the edges from
+        minute buckets. Edges older than STATS_MINUTE_DAYS are widened to
+        whole hours. Counts not flushed yet by this process are included.
+        :param since: Window start
+        :param until: Window end, now by default
+        """
+        since, until = self._bounds(since, until or datetime.utcnow())
+        totals: Counter = Counter()
+
+        first_hour = _ceil(since, HOUR)
+        last_hour = _floor(until, HOUR)
+        if first_hour < last_hour:
+            await self._sum("minute", since, first_hour, totals)
+            await self._sum("hour", first_hour, last_hour, totals)
+            await self._sum("minute", last_hour, until, totals)
+        else:
+            await self._sum("minute", since, until, totals)
+
+        for minute, counts in self._pending.items():
+            if since <= minute < until:
+                totals.update(counts)
+        return totals
+
+    async def rates(self, window: timedelta) -> Dict[str, Tuple[int, float]]:
+        """
+        Totals and per-minute rates over the last `window`.
+        :return: Counter name to (total, per minute)
+        """
+        now = datetime.utcnow()
+        totals = await self.totals_between(now - window, now)
+        # Divide by the time the buckets read cover, up to now; an old
+        # edge widened to the hour covers more than the window
+        since, _ = self._bounds(now - window, now)
+        minutes = max((now - since).total_seconds() / 60, 1)
+        return {name: (value, value / minutes) for name, value in sorted(totals.items())}
+
+
+# Shared stats recorder
+stats_recorder = StatsRecorder(Config.STATS_FLUSH_INTERVAL)
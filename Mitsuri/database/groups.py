@@ -1,6 +1,11 @@
-from pymongo import MongoClient
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
 from ..core.mongo import get_database
+from .paging import iter_documents
+from .writebehind import new_buffer
+
+# Batched group upserts, shared by all GroupModel instances
+group_writes = new_buffer("groups", "group_id")
 
 
 class GroupModel:
@@ -11,44 +16,55 @@ class GroupModel:
     def __init__(self):
         self.collection = get_database()["groups"]
 
-    def add_group(self, group_id: int, title: str):
+    async def add_group(self, group_id: int, title: str):
         """
         Add or update a group in the database.
+        The write is batched, and skipped if the title didn't change recently.
         :param group_id: Telegram group ID
         :param title: Group title
         """
-        self.collection.update_one(
-            {"group_id": group_id},
-            {
-                "$set": {
-                    "title": title,
-                    "updated_at": datetime.utcnow()
-                },
-                "$setOnInsert": {
-                    "created_at": datetime.utcnow()
-                }
-            },
-            upsert=True
-        )
-
-    def get_group(self, group_id: int):
+        group_writes.upsert(group_id, {"title": title}, {"created_at": datetime.utcnow()})
+
+    async def get_group(self, group_id: int):
         """
         Retrieve group data from the database.
         :param group_id: Telegram group ID
         :return: Group document
         """
-        return self.collection.find_one({"group_id": group_id})
+        return await self.collection.find_one({"group_id": group_id})
 
-    def delete_group(self, group_id: int):
+    async def delete_group(self, group_id: int):
         """
         Delete a group from the database.
         :param group_id: Telegram group ID
         """
-        self.collection.delete_one({"group_id": group_id})
+        await self.collection.delete_one({"group_id": group_id})
 
-    def get_all_groups(self):
+    async def get_all_groups(self):
         """
         Retrieve all groups from the database.
+        Loads every document at once; prefer iter_groups for large collections.
         :return: List of group documents
         """
-        return list(self.collection.find())
+        return await self.collection.find().to_list(length=None)
+
+    def iter_groups(
+        self,
+        projection: Optional[Dict[str, Any]] = None,
+        active_since: Optional[datetime] = None,
+        batch_size: Optional[int] = None,
+        after: Any = None,
+        key: str = "_id"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream groups page by page.
+        :param projection: Fields to return, e.g. {"group_id": 1}
+        :param active_since: Only groups seen since this time
+        :param batch_size: Groups fetched per query
+        :param after: Resume after the group with this `key` value
+        :param key: Field to order and resume by, _id or group_id
+        """
+        query: Dict[str, Any] = {}
+        if active_since is not None:
+            query["updated_at"] = {"$gte": active_since}
+        return iter_documents(self.collection, query, projection, batch_size, key, after)
@@ -0,0 +1,150 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from ..config import Config
+
+logger = logging.getLogger("Mitsuri.database.indexes")
+
+# Server error codes for an existing index with the same name/keys but other options
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+class IndexSpec(NamedTuple):
+    """
+    An index a collection should have.
+    """
+
+    collection: str
+    name: str
+    keys: List[Tuple[str, int]]
+    options: Dict[str, Any] = {}
+
+
+def _ttl(seconds: int) -> Dict[str, Any]:
+    return {"expireAfterSeconds": seconds}
+
+
+def _unique_when_present(field: str) -> Dict[str, Any]:
+    # Settings documents carry either user_id or group_id, so a plain
+    # unique index would reject the second document missing the field
+    return {"unique": True, "partialFilterExpression": {field: {"$exists": True}}}
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("users", "user_id_unique", [("user_id", ASCENDING)], {"unique": True}),
+    IndexSpec("users", "updated_at", [("updated_at", DESCENDING)]),
+    IndexSpec("groups", "group_id_unique", [("group_id", ASCENDING)], {"unique": True}),
+    IndexSpec("groups", "updated_at", [("updated_at", DESCENDING)]),
+    IndexSpec("settings", "user_id_unique", [("user_id", ASCENDING)], _unique_when_present("user_id")),
+    IndexSpec("settings", "group_id_unique", [("group_id", ASCENDING)], _unique_when_present("group_id")),
+    IndexSpec("broadcasts", "status", [("status", ASCENDING)]),
+    IndexSpec(
+        "broadcast_recipients", "job_user",
+        [("job_id", ASCENDING), ("user_id", ASCENDING)]
+    ),
+    IndexSpec(
+        "broadcast_recipients", "at_ttl",
+        [("at", ASCENDING)], _ttl(Config.BROADCAST_RECORD_DAYS * 86400)
+    ),
+    # Ephemeral state: documents expire at their own expires_at
+    IndexSpec("cooldowns", "expires_at_ttl", [("expires_at", ASCENDING)], _ttl(0)),
+    IndexSpec("blacklist", "updated_at", [("updated_at", ASCENDING)]),
+]
+
+
+def register_index(spec: IndexSpec) -> None:
+    """
+    Add an index to the registry. Call before ensure_indexes runs.
+    :param spec: Index specification
+    """
+    INDEXES.append(spec)
+
+
+async def _ensure(db, spec: IndexSpec) -> None:
+    collection = db[spec.collection]
+    try:
+        await collection.create_index(spec.keys, name=spec.name, background=True, **spec.options)
+    except OperationFailure as e:
+        if e.code not in INDEX_CONFLICT_CODES:
+            raise
+        ttl = spec.options.get("expireAfterSeconds")
+        if ttl is None:
+            logger.warning(f"Index {spec.collection}.{spec.name} exists with other options: {e}")
+            return
+        # A changed retention period is updated in place instead of rebuilding
+        await db.command(
+            "collMod", spec.collection,
+            index={"name": spec.name, "expireAfterSeconds": ttl}
+        )
+        logger.info(f"Updated TTL of {spec.collection}.{spec.name} to {ttl}s")
+
+
+async def ensure_indexes(db) -> None:
+    """
+    Create every registered index that doesn't exist yet. Idempotent; indexes
+    that already exist are left alone apart from TTL changes.
+    :param db: Motor database
+    """
+    for spec in INDEXES:
+        try:
+            await _ensure(db, spec)
+        except Exception as e:
+            logger.error(f"Error creating index {spec.collection}.{spec.name}: {str(e)}")
+    logger.info(f"Ensured {len(INDEXES)} indexes")
+
+
+async def index_report(db) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compare the registry with the server.
+    :param db: Motor database
+    :return: Per collection: "missing" registered indexes that don't exist,
+             "unregistered" indexes that exist but aren't registered, and
+             "unused" indexes with no recorded accesses since the server started
+    """
+    report: Dict[str, Dict[str, List[str]]] = {}
+    for name in sorted({spec.collection for spec in INDEXES}):
+        collection = db[name]
+        registered = {spec.name for spec in INDEXES if spec.collection == name}
+        existing = set(await collection.index_information()) - {"_id_"}
+        usage = {}
+        try:
+            async for stats in collection.aggregate([{"$indexStats": {}}]):
+                usage[stats["name"]] = stats["accesses"]["ops"]
+        except OperationFailure:
+            # $indexStats needs extra privileges on some hosted clusters
+            pass
+        report[name] = {
+            "missing": sorted(registered - existing),
+            "unregistered": sorted(existing - registered),
+            "unused": sorted(index for index in existing if usage.get(index) == 0),
+        }
+    return report
+
+
+async def log_index_report(db) -> None:
+    """
+    Log anything noteworthy from index_report.
+    """
+    try:
+        report = await index_report(db)
+    except Exception as e:
+        logger.error(f"Error building index report: {str(e)}")
+        return
+    for collection, entry in report.items():
+        if entry["missing"]:
+            logger.warning(f"{collection}: missing indexes {', '.join(entry['missing'])}")
+        if entry["unregistered"]:
+            logger.info(f"{collection}: unregistered indexes {', '.join(entry['unregistered'])}")
+        if entry["unused"]:
+            logger.info(f"{collection}: unused indexes {', '.join(entry['unused'])}")
+
+
+async def setup_indexes(db) -> None:
+    """
+    Ensure indexes, then report on them. Run as a background task at startup.
+    """
+    await ensure_indexes(db)
+    await log_index_report(db)
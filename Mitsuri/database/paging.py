@@ -0,0 +1,48 @@
+from typing import Any, AsyncIterator, Dict, Optional
+
+from ..config import Config
+
+
+async def iter_documents(
+    collection,
+    query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: Optional[int] = None,
+    key: str = "_id",
+    after: Any = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream documents in `key` order, one page of `batch_size` at a time.
+    Each page is a separate query starting after the last key seen, so no
+    server cursor is held open between pages and only one page is in
+    memory. To resume, pass the `key` value of the last document handled.
+    :param collection: Motor collection
+    :param query: Filter
+    :param projection: Fields to return; `key` is always included
+    :param batch_size: Documents per query, Config.DB_BATCH_SIZE by default
+    :param key: Unique, indexed field to page on
+    :param after: Only documents whose `key` is greater than this
+    """
+    batch_size = batch_size or Config.DB_BATCH_SIZE
+    if projection is not None:
+        # Mongo rejects mixing inclusions and exclusions (except for _id),
+        # so only an inclusion projection gets the key added
+        inclusion = any(value for field, value in projection.items() if field != "_id")
+        if inclusion or key == "_id":
+            projection = {**projection, key: 1}
+        else:
+            # Exclusions return the key unless it is excluded itself
+            projection = {field: value for field, value in projection.items() if field != key}
+    last = after
+    while True:
+        page_query = dict(query or {})
+        if last is not None:
+            page_query[key] = {"$gt": last}
+        cursor = collection.find(page_query, projection).sort(key, 1).limit(batch_size)
+        count = 0
+        async for doc in cursor:
+            count += 1
+            last = doc[key]
+            yield doc
+        if count < batch_size:
+            return
@@ -1,52 +1,177 @@
-from pymongo import MongoClient
 from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+from pyrogram.types import CallbackQuery, Message
+from ..config import Config
 from ..core.mongo import get_database
+from ..utils.cache import AsyncTTLCache
+
+_MISSING = object()
+
+# Settings documents keyed by ("user", user_id) / ("group", group_id).
+# Missing documents are cached as None
+settings_cache = AsyncTTLCache(
+    maxsize=Config.SETTINGS_CACHE_SIZE,
+    ttl=Config.SETTINGS_CACHE_TTL,
+    negative_ttl=Config.SETTINGS_NEGATIVE_TTL
+)
+
+
+class EffectiveSettings(NamedTuple):
+    """
+    Settings in force for a user in a chat. Field defaults are the code
+    defaults; group settings override them and user settings override both.
+    """
+
+    notifications: bool = True
+    theme: str = "light"
+    privacy: bool = False
+
+    @classmethod
+    def merge(cls, *docs: Optional[Dict[str, Any]]) -> "EffectiveSettings":
+        """
+        Build settings from documents, later documents taking precedence.
+        Document fields that aren't settings are ignored.
+        """
+        values = {}
+        for doc in docs:
+            if doc:
+                values.update((field, doc[field]) for field in cls._fields if field in doc)
+        return cls(**values) if values else DEFAULT_SETTINGS
+
+
+DEFAULT_SETTINGS = EffectiveSettings()
 
 
 class SettingsModel:
     """
     Database model for managing user and group settings.
+    Reads go through settings_cache; updates invalidate it.
     """
 
     def __init__(self):
         self.collection = get_database()["settings"]
 
-    def update_user_settings(self, user_id: int, settings: dict):
+    async def update_user_settings(self, user_id: int, settings: dict):
         """
         Update settings for a specific user.
         :param user_id: Telegram user ID
         :param settings: Dictionary of settings to update
         """
-        self.collection.update_one(
+        await self.collection.update_one(
             {"user_id": user_id},
             {"$set": settings, "$setOnInsert": {"created_at": datetime.utcnow()}},
             upsert=True
         )
+        settings_cache.invalidate(("user", user_id))
 
-    def update_group_settings(self, group_id: int, settings: dict):
+    async def update_group_settings(self, group_id: int, settings: dict):
         """
         Update settings for a specific group.
         :param group_id: Telegram group ID
         :param settings: Dictionary of settings to update
         """
-        self.collection.update_one(
+        await self.collection.update_one(
             {"group_id": group_id},
             {"$set": settings, "$setOnInsert": {"created_at": datetime.utcnow()}},
             upsert=True
         )
+        settings_cache.invalidate(("group", group_id))
 
-    def get_user_settings(self, user_id: int):
+    async def get_user_settings(self, user_id: int):
         """
         Retrieve settings for a specific user.
         :param user_id: Telegram user ID
-        :return: Settings document
+        :return: Settings document, shared with the cache so don't modify it
         """
-        return self.collection.find_one({"user_id": user_id})
+        return await settings_cache.get_or_load(
+            ("user", user_id),
+            lambda: self.collection.find_one({"user_id": user_id})
+        )
 
-    def get_group_settings(self, group_id: int):
+    async def get_group_settings(self, group_id: int):
         """
         Retrieve settings for a specific group.
         :param group_id: Telegram group ID
-        :return: Settings document
+        :return: Settings document, shared with the cache so don't modify it
+        """
+        return await settings_cache.get_or_load(
+            ("group", group_id),
+            lambda: self.collection.find_one({"group_id": group_id})
+        )
+
+    async def resolve(self, user_id: int, group_id: Optional[int] = None) -> EffectiveSettings:
         """
-        return self.collection.find_one({"group_id": group_id})
+        Settings in force for a user, in a group if given.
+        Whatever isn't cached is fetched in a single query.
+        :param user_id: Telegram user ID
+        :param group_id: Telegram group ID, None in private chats
+        :return: Merged settings
+        """
+        keys = [("user", user_id)]
+        if group_id is not None:
+            keys.append(("group", group_id))
+        docs = {key: settings_cache.get(key, _MISSING) for key in keys}
+        missing = [key for key, doc in docs.items() if doc is _MISSING]
+
+        if missing:
+            generation = settings_cache.generation
+            query = [{f"{kind}_id": value} for kind, value in missing]
+            found = {key: None for key in missing}
+            async for doc in self.collection.find(query[0] if len(query) == 1 else {"$or": query}):
+                if doc.get("user_id") == user_id and ("user", user_id) in found:
+                    found[("user", user_id)] = doc
+                elif group_id is not None and doc.get("group_id") == group_id:
+                    found[("group", group_id)] = doc
+            # Only cache what no update could have changed in the meantime
+            if settings_cache.generation == generation:
+                for key, doc in found.items():
+                    settings_cache.set(key, doc)
+            docs.update(found)
+
+        return EffectiveSettings.merge(docs.get(("group", group_id)), docs[("user", user_id)])
+
+
+def _update_scope(update: Union[Message, CallbackQuery]) -> Tuple[int, Optional[int]]:
+    """
+    :return: (sender's user ID, group ID or None in private chats)
+    """
+    message = update.message if isinstance(update, CallbackQuery) else update
+    user_id = update.from_user.id
+    chat_id = message.chat.id if message is not None and message.chat else user_id
+    # Groups and channels have negative IDs
+    return user_id, chat_id if chat_id < 0 else None
+
+
+async def settings_for(update: Union[Message, CallbackQuery], model: Optional[SettingsModel] = None) -> EffectiveSettings:
+    """
+    Effective settings for the sender of an update in its chat, resolved
+    once and remembered on the update for the rest of its handling.
+    :param update: Pyrogram message or callback query
+    :param model: SettingsModel to resolve with, a new one by default
+    """
+    memo = update.__dict__.setdefault("_effective_settings", {})
+    scope = _update_scope(update)
+    settings = memo.get(scope)
+    if settings is None:
+        settings = await (model or SettingsModel()).resolve(*scope)
+        memo[scope] = settings
+    return settings
+
+
+async def update_settings_for(
+    update: Union[Message, CallbackQuery],
+    changes: Dict[str, Any],
+    model: Optional[SettingsModel] = None
+) -> EffectiveSettings:
+    """
+    Save changes to the sender's own settings and refresh the settings
+    remembered on the update.
+    :param update: Pyrogram message or callback query
+    :param changes: Settings to set
+    :param model: SettingsModel to use, a new one by default
+    :return: Effective settings after the change
+    """
+    model = model or SettingsModel()
+    await model.update_user_settings(update.from_user.id, changes)
+    update.__dict__.get("_effective_settings", {}).pop(_update_scope(update), None)
+    return await settings_for(update, model)
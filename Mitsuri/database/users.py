@@ -1,6 +1,11 @@
-from pymongo import MongoClient
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
 from ..core.mongo import get_database
+from .paging import iter_documents
+from .writebehind import new_buffer
+
+# Batched user upserts, shared by all UserModel instances
+user_writes = new_buffer("users", "user_id")
 
 
 class UserModel:
@@ -11,44 +16,59 @@ class UserModel:
     def __init__(self):
         self.collection = get_database()["users"]
 
-    def add_user(self, user_id: int, username: str):
+    async def add_user(self, user_id: int, username: str):
         """
         Add or update a user in the database.
+        The write is batched, and skipped if the username didn't change recently.
         :param user_id: Telegram user ID
         :param username: Telegram username
         """
-        self.collection.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "username": username,
-                    "updated_at": datetime.utcnow()
-                },
-                "$setOnInsert": {
-                    "joined_at": datetime.utcnow()
-                }
-            },
-            upsert=True
-        )
-
-    def get_user(self, user_id: int):
+        user_writes.upsert(user_id, {"username": username}, {"joined_at": datetime.utcnow()})
+
+    async def get_user(self, user_id: int):
         """
         Retrieve user data from the database.
         :param user_id: Telegram user ID
         :return: User document
         """
-        return self.collection.find_one({"user_id": user_id})
+        return await self.collection.find_one({"user_id": user_id})
 
-    def delete_user(self, user_id: int):
+    async def delete_user(self, user_id: int):
         """
         Delete a user from the database.
         :param user_id: Telegram user ID
         """
-        self.collection.delete_one({"user_id": user_id})
+        await self.collection.delete_one({"user_id": user_id})
 
-    def get_all_users(self):
+    async def get_all_users(self):
         """
         Retrieve all users from the database.
+        Loads every document at once; prefer iter_users for large collections.
         :return: List of user documents
         """
-        return list(self.collection.find())
+        return await self.collection.find().to_list(length=None)
+
+    def iter_users(
+        self,
+        projection: Optional[Dict[str, Any]] = None,
+        active_since: Optional[datetime] = None,
+        include_blocked: bool = True,
+        batch_size: Optional[int] = None,
+        after: Any = None,
+        key: str = "_id"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream users page by page.
+        :param projection: Fields to return, e.g. {"user_id": 1}
+        :param active_since: Only users seen since this time
+        :param include_blocked: Include users who blocked the bot
+        :param batch_size: Users fetched per query
+        :param after: Resume after the user with this `key` value
+        :param key: Field to order and resume by, _id or user_id
+        """
+        query: Dict[str, Any] = {}
+        if active_since is not None:
+            query["updated_at"] = {"$gte": active_since}
+        if not include_blocked:
+            query["blocked"] = {"$ne": True}
+        return iter_documents(self.collection, query, projection, batch_size, key, after)
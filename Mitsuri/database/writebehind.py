@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from ..config import Config
+from ..core.mongo import get_database
+
+logger = logging.getLogger("Mitsuri.database.writebehind")
+
+# Every buffer created, so shutdown can flush them all
+buffers: List["WriteBehindBuffer"] = []
+
+
+class WriteBehindBuffer:
+    """
+    Buffers upserts keyed by one field and writes them as unordered
+    bulk_write batches of up to `max_ops`, every `interval` seconds or
+    as soon as `max_ops` are pending. Repeated upserts for a key between
+    flushes collapse into one.
+    Keys written recently are remembered in a bounded LRU; an upsert with
+    the same fields within `freshness` seconds of the last write is skipped.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        key_field: str,
+        interval: float = 0.5,
+        max_ops: int = 500,
+        seen_size: int = 50000,
+        freshness: float = 3600
+    ):
+        """
+        :param collection: Collection name
+        :param key_field: Field identifying a document, e.g. user_id
+        :param interval: Seconds between flushes
+        :param max_ops: Pending upserts that trigger an early flush
+        :param seen_size: Keys remembered for skipping unchanged upserts
+        :param freshness: Seconds an unchanged document is not rewritten
+        """
+        self.collection = collection
+        self.key_field = key_field
+        self.interval = interval
+        self.max_ops = max(1, max_ops)
+        self.seen_size = seen_size
+        self.freshness = freshness
+        self._pending: Dict[Any, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self._seen: "OrderedDict[Any, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.skipped = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        buffers.append(self)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def upsert(self, key: Any, fields: Dict[str, Any], on_insert: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Queue an upsert of `fields` (plus updated_at) for the document with this key.
+        :param key: Value of the key field
+        :param fields: Fields to $set
+        :param on_insert: Fields to $setOnInsert
+        :return: False if skipped because nothing changed recently
+        """
+        pending = self._pending.get(key)
+        if pending is not None:
+            # The latest upsert wins even if it matches what was written
+            # before; keep the first $setOnInsert, it carries the earliest timestamp
+            self._pending[key] = (fields, pending[1])
+            return True
+
+        seen = self._seen.get(key)
+        if seen is not None:
+            self._seen.move_to_end(key)
+            if seen[0] == fields and time.monotonic() - seen[1] < self.freshness:
+                self.skipped += 1
+                return False
+
+        self._pending[key] = (fields, on_insert or {})
+
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+        if len(self._pending) >= self.max_ops:
+            self._wakeup.set()
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Write everything pending now.
+        """
+        async with self._flush_lock:
+            while self._pending:
+                keys = list(islice(self._pending, self.max_ops))
+                batch = {key: self._pending.pop(key) for key in keys}
+                if not await self._write(batch):
+                    break
+
+    async def _write(self, batch: Dict[Any, Tuple[Dict[str, Any], Dict[str, Any]]]) -> bool:
+        now = datetime.utcnow()
+        operations = []
+        for key, (fields, on_insert) in batch.items():
+            # What was written before no longer says what the document holds
+            self._seen.pop(key, None)
+            update = {"$set": {**fields, "updated_at": now}}
+            if on_insert:
+                update["$setOnInsert"] = on_insert
+            operations.append(UpdateOne({self.key_field: key}, update, upsert=True))
+
+        start = time.perf_counter()
+        try:
+            await get_database()[self.collection].bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Requeue unless a newer upsert for the key arrived meanwhile
+            self.errors += 1
+            for key, value in batch.items():
+                self._pending.setdefault(key, value)
+            logger.error(f"Error flushing {len(batch)} {self.collection} upserts: {str(e)}")
+            return False
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.flushes += 1
+        self.written += len(batch)
+        self.last_flush_ms = elapsed
+        self._total_flush_ms += elapsed
+        if elapsed > self.max_flush_ms:
+            self.max_flush_ms = elapsed
+
+        written_at = time.monotonic()
+        for key, (fields, _) in batch.items():
+            self._seen[key] = (fields, written_at)
+            self._seen.move_to_end(key)
+        while len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+        return True
+
+    async def stop(self) -> None:
+        """
+        Stop the periodic flush and write what is still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._pending),
+            "seen": len(self._seen),
+            "written": self.written,
+            "skipped": self.skipped,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": self._total_flush_ms / self.flushes if self.flushes else 0.0,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+def new_buffer(collection: str, key_field: str) -> WriteBehindBuffer:
+    """
+    Create a buffer using the configured batching settings.
+    """
+    return WriteBehindBuffer(
+        collection,
+        key_field,
+        interval=Config.WRITE_BEHIND_INTERVAL,
+        max_ops=Config.WRITE_BEHIND_MAX_OPS,
+        seen_size=Config.SEEN_CACHE_SIZE,
+        freshness=Config.SEEN_FRESHNESS
+    )
+
+
+async def flush_all() -> None:
+    """
+    Stop every buffer, writing out anything pending. Called on shutdown.
+    """
+    for buffer in buffers:
+        try:
+            await buffer.stop()
+        except Exception as e:
+            logger.error(f"Error flushing {buffer.collection} upserts: {str(e)}")
@@ -1,4 +1,4 @@
 """
 Middleware for Mitsuri Bot.
-Includes rate limiting, blacklisting, and message logging.
+Includes rate limiting, blacklisting, statistics, and message logging.
 """
@@ -1,8 +1,27 @@
+from pyrogram import Client
 from pyrogram.types import Message
 
-# Blacklist for users and words
-blacklisted_users = set()
-blacklisted_words = set()
+from ..config import Config
+from ..core.blacklist import blacklist_store
+from ..utils.helpers import run_async
+from ..utils.wordmatch import WordMatcher, fold
+from .pipeline import Middleware
+
+# Compiled word blacklist, replaced as a whole by rebuild_word_matcher
+word_matcher = WordMatcher(Config.BLACKLISTED_WORDS, whole_words=Config.BLACKLIST_WHOLE_WORDS)
+
+
+async def rebuild_word_matcher(words=None) -> None:
+    """
+    Recompile the word blacklist off the event loop and swap it in.
+    :param words: New word list, defaults to Config.BLACKLISTED_WORDS
+    """
+    global word_matcher
+    words = list(Config.BLACKLISTED_WORDS if words is None else words)
+    word_matcher = await run_async(WordMatcher, words, Config.BLACKLIST_WHOLE_WORDS)
+
+
+blacklist_store.on_words_change(rebuild_word_matcher)
 
 
 async def check_blacklist(message: Message):
@@ -13,13 +32,26 @@ async def check_blacklist(message: Message):
     user_id = message.from_user.id
     text = message.text or ""
 
-    if user_id in blacklisted_users:
+    if user_id in blacklist_store.users:
         await message.reply_text("❌ You are blacklisted from using this bot.")
         return False
 
-    for word in blacklisted_words:
-        if word in text.lower():
+    matcher = word_matcher
+    if matcher and text:
+        word = matcher.search(fold(text))
+        if word:
             await message.reply_text(f"❌ Your message contains a blacklisted word: {word}")
             return False
 
     return True
+
+
+class BlacklistMiddleware(Middleware):
+    """
+    Rejects messages from blacklisted users or containing blacklisted words.
+    """
+
+    name = "blacklist"
+
+    async def handle(self, update: Message, client: Client) -> bool:
+        return await check_blacklist(update)
@@ -1,13 +1,12 @@
 import logging
-from datetime import datetime
+from pyrogram import Client
 from pyrogram.types import Message
 
-# Set up logging
-logging.basicConfig(
-    filename="logs/mitsuri.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+from ..config import Config
+from ..core.archive import event_archive, message_event
+from .pipeline import Middleware
+
+logger = logging.getLogger("Mitsuri.middleware.logger")
 
 
 async def log_message(message: Message):
@@ -15,10 +14,28 @@ async def log_message(message: Message):
     Log incoming messages to a file.
     :param message: Incoming message
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
     user = message.from_user
     chat = message.chat
-    log_entry = (
-        f"{datetime.utcnow()} - User: {user.id} ({user.first_name}) "
-        f"in Chat: {chat.id} ({chat.title if chat.title else 'Private'}) - Message: {message.text}"
+    # %-args merge here, on the calling thread; only the file and console writes run on the log writer thread
+    logger.info(
+        "User: %s (%s) in Chat: %s (%s) - Message: %s",
+        user.id, user.first_name, chat.id, chat.title or "Private", message.text
     )
-    logging.info(log_entry)
+
+
+class LoggerMiddleware(Middleware):
+    """
+    Records every message that made it through the earlier stages, in the
+    event archive or, with the archive disabled, the text log.
+    """
+
+    name = "logger"
+
+    async def handle(self, update: Message, client: Client) -> bool:
+        if Config.ARCHIVE_ENABLED:
+            event_archive.add(message_event(update))
+        else:
+            await log_message(update)
+        return True
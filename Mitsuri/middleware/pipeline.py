@@ -0,0 +1,124 @@
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+from pyrogram import Client, filters
+from pyrogram.handlers import MessageHandler
+from pyrogram.types import Message
+
+logger = logging.getLogger("Mitsuri.middleware")
+
+# Handler group the pipeline runs in. Pyrogram dispatches groups in
+# ascending order, so this runs before any plugin handler (group 0)
+MIDDLEWARE_GROUP = -1000
+
+
+class Middleware:
+    """
+    Base class for update middlewares.
+    `handle` returns False to reject the update.
+    """
+
+    name: str = ""
+
+    async def handle(self, update: Message, client: Client) -> bool:
+        raise NotImplementedError
+
+
+class StageStats:
+    """
+    Timing and outcome counters for one pipeline stage.
+    """
+
+    __slots__ = ("calls", "rejected", "errors", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.rejected = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_ms": self.total_time / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_time * 1000,
+        }
+
+
+class MiddlewarePipeline:
+    """
+    Ordered chain of middlewares run on every incoming message.
+    The chain is compiled into a tuple of bound handlers whenever a
+    middleware is added, so running it is a plain loop. Registered as the
+    lowest-group Pyrogram handler, it stops propagation of rejected
+    updates before any plugin filter is evaluated.
+    """
+
+    def __init__(self):
+        self._middleware: List[Middleware] = []
+        self._chain: Tuple[Tuple[str, Any, StageStats], ...] = ()
+        self._stats: Dict[str, StageStats] = {}
+
+    def add(self, middleware: Middleware) -> None:
+        """
+        Append a middleware and recompile the chain.
+        :param middleware: Middleware instance
+        """
+        self._middleware.append(middleware)
+        self.compile()
+
+    def compile(self) -> None:
+        chain = []
+        for middleware in self._middleware:
+            name = middleware.name or middleware.__class__.__name__
+            stats = self._stats.setdefault(name, StageStats())
+            chain.append((name, middleware.handle, stats))
+        self._chain = tuple(chain)
+
+    async def run(self, update: Message, client: Client) -> bool:
+        """
+        Run the chain on an update.
+        :return: False if a middleware rejected it
+        """
+        clock = time.perf_counter
+        for name, handle, stats in self._chain:
+            start = clock()
+            try:
+                allowed = await handle(update, client)
+            except Exception as e:
+                logger.error(f"Error in middleware {name}: {str(e)}")
+                stats.errors += 1
+                allowed = True
+            elapsed = clock() - start
+
+            stats.calls += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+            if not allowed:
+                stats.rejected += 1
+                return False
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-stage counters, in chain order.
+        """
+        return {name: stats.as_dict() for name, _, stats in self._chain}
+
+    async def _on_message(self, client: Client, message: Message) -> None:
+        if not await self.run(message, client):
+            message.stop_propagation()
+
+    def handler(self) -> MessageHandler:
+        """
+        Pyrogram handler running the pipeline on user messages.
+        """
+        return MessageHandler(
+            self._on_message,
+            filters.incoming & filters.create(lambda _, __, message: bool(message.from_user))
+        )
@@ -0,0 +1,26 @@
+from pyrogram import Client
+from pyrogram.types import Message
+
+from ..core.analytics import group_analytics
+from ..core.stats import stats_recorder
+from ..utils.commands import command_name
+from .pipeline import Middleware
+
+
+class StatsMiddleware(Middleware):
+    """
+    Counts messages and commands that made it through the earlier stages,
+    bot-wide and per group.
+    """
+
+    name = "stats"
+
+    async def handle(self, update: Message, client: Client) -> bool:
+        command = command_name(update)
+        stats_recorder.incr("messages_processed")
+        if command:
+            stats_recorder.incr("commands_executed")
+        # Groups and supergroups have negative IDs
+        if update.chat and update.chat.id < 0:
+            group_analytics.record_message(update.chat.id, update.from_user.id, command)
+        return True
@@ -1,28 +1,46 @@
-from time import time
+from math import ceil
 from pyrogram import Client
 from pyrogram.types import Message
 
-# Cache to store last message timestamps
-user_last_message = {}
+from ..config import Config
+from ..utils.commands import is_command
+from ..utils.ratelimit import RateLimiter
+from .pipeline import Middleware
 
+# Allows Config.RATE_LIMIT messages per Config.RATE_LIMIT_WINDOW seconds
+limiter = RateLimiter(Config.RATE_LIMIT, Config.RATE_LIMIT_WINDOW, Config.RATE_LIMIT_SCOPE)
+# At most one "please wait" notice per window, so throttling doesn't turn into spam of its own
+notice_limiter = RateLimiter(1, Config.RATE_LIMIT_WINDOW, Config.RATE_LIMIT_SCOPE)
 
-async def throttle_user(client: Client, message: Message, cooldown: int = 5):
+
+async def throttle_user(client: Client, message: Message, limiter: RateLimiter = limiter):
     """
     Throttle messages from users to prevent spam.
     :param client: Pyrogram client
     :param message: Incoming message
-    :param cooldown: Cooldown period in seconds
+    :param limiter: Rate limiter to count the message against
+    """
+    key = limiter.key_for(message.from_user.id, message.chat.id)
+    retry_after = limiter.hit(key)
+    if not retry_after:
+        return True
+
+    if not notice_limiter.hit(key):
+        await message.reply_text(
+            f"⏳ Please wait {ceil(retry_after)} seconds before sending another message."
+        )
+    return False
+
+
+class ThrottleMiddleware(Middleware):
+    """
+    Rejects commands sent faster than the configured rate limit.
+    Plain chatter isn't answered by the bot, so only commands are throttled.
     """
-    user_id = message.from_user.id
-    current_time = time()
-
-    if user_id in user_last_message:
-        last_message_time = user_last_message[user_id]
-        if current_time - last_message_time < cooldown:
-            await message.reply_text(
-                f"⏳ Please wait {int(cooldown - (current_time - last_message_time))} seconds before sending another message."
-            )
-            return False
-
-    user_last_message[user_id] = current_time
-    return True
+
+    name = "throttle"
+
+    async def handle(self, update: Message, client: Client) -> bool:
+        if not is_command(update):
+            return True
+        return await throttle_user(client, update)
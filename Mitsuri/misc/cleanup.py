@@ -1,4 +1,5 @@
 import os
+from ..config import Config
 from ..core.logger import setup_logger
 
 logger = setup_logger("Mitsuri.Cleanup")
@@ -28,6 +29,7 @@ def clear_temp_files(temp_dir: str = "downloads/temp"):
 def cleanup_logs(log_dir: str = "logs", max_size_mb: int = 5):
     """
     Clean up log files if they exceed the specified size limit.
+    The event archive manages its own retention and is never touched.
     :param log_dir: Path to the logs directory
     :param max_size_mb: Maximum allowed size of log files in MB
     """
@@ -36,8 +38,12 @@ def cleanup_logs(log_dir: str = "logs", max_size_mb: int = 5):
         logger.warning(f"Log directory '{log_dir}' does not exist.")
         return
 
+    archive_dir = os.path.abspath(Config.ARCHIVE_DIR)
     try:
-        for root, _, files in os.walk(log_dir):
+        for root, dirs, files in os.walk(log_dir):
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != archive_dir]
+            if os.path.abspath(root) == archive_dir:
+                continue
             for file in files:
                 file_path = os.path.join(root, file)
                 if os.path.getsize(file_path) > max_size_mb * 1024 * 1024:
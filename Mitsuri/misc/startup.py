@@ -1,26 +1,22 @@
-import os
 from pyrogram import Client
 from ..core.logger import setup_logger
+from ..core.plugins import PluginLoader
 
 logger = setup_logger("Mitsuri.Startup")
 
 
 async def load_plugins(client: Client, plugin_path: str = "Mitsuri/plugins"):
     """
-    Load bot plugins dynamically at startup.
+    Register bot plugins at startup. Plugins are indexed rather than
+    imported; most are only imported when first used.
     :param client: Pyrogram client instance
     :param plugin_path: Path to the plugins directory
     """
     logger.info(f"Loading plugins from '{plugin_path}'...")
-    for root, _, files in os.walk(plugin_path):
-        for file in files:
-            if file.endswith(".py") and file != "__init__.py":
-                module_name = os.path.relpath(os.path.join(root, file), ".").replace("/", ".").replace("\\", ".")[:-3]
-                try:
-                    __import__(module_name)
-                    logger.info(f"Successfully loaded plugin: {module_name}")
-                except Exception as e:
-                    logger.error(f"Failed to load plugin {module_name}: {e}")
+    loader = getattr(client, "plugin_loader", None)
+    if loader is None:
+        loader = PluginLoader(client, root=plugin_path.strip("/").replace("/", "."))
+    loader.load()
 
 
 async def initialize_bot_data(client: Client):
@@ -0,0 +1,513 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import pytz
+from pymongo import ASCENDING, DESCENDING, DeleteOne, ReturnDocument, UpdateOne
+
+from ..config import Config
+from ..core.blacklist import atomic_write_json
+from ..core.mongo import get_database
+from ..database.indexes import IndexSpec, register_index
+
+logger = logging.getLogger("Mitsuri.platforms.cache")
+
+COLLECTION = "response_cache"
+
+register_index(IndexSpec(COLLECTION, "purge_at_ttl", [("purge_at", ASCENDING)], {"expireAfterSeconds": 0}))
+
+# Every cache created, so shutdown can save them all
+caches: List["ResponseCache"] = []
+
+# key, value, fetched_at, expires_at (epoch seconds)
+Entry = Tuple[str, Any, float, float]
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a call would exceed the daily quota and nothing, not even
+    a stale response, is cached for it.
+    """
+
+
+class QuotaLedger:
+    """
+    Units spent against an API's daily quota. The day rolls over at
+    midnight in `timezone`, as the provider counts it.
+    """
+
+    def __init__(self, daily_limit: int, timezone: str = "UTC"):
+        """
+        :param daily_limit: Units available per day
+        :param timezone: Timezone whose midnight resets the quota
+        """
+        self.daily_limit = daily_limit
+        self.timezone = pytz.timezone(timezone)
+        self._day: Optional[str] = None
+        self.spent = 0
+        # Spent since the last save, for stores that add rather than overwrite
+        self.unsaved = 0
+
+    def _today(self) -> str:
+        return datetime.now(self.timezone).date().isoformat()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.spent = 0
+            self.unsaved = 0
+
+    @property
+    def day(self) -> str:
+        """
+        The quota day now, as an ISO date.
+        """
+        self._roll()
+        return self._day
+
+    def remaining(self) -> int:
+        """
+        Units left today.
+        """
+        self._roll()
+        return max(self.daily_limit - self.spent, 0)
+
+    def try_spend(self, units: int) -> bool:
+        """
+        Reserve units for a call.
+        :return: False if they would exceed today's quota
+        """
+        self._roll()
+        if self.spent + units > self.daily_limit:
+            return False
+        self.spent += units
+        self.unsaved += units
+        return True
+
+    def exhaust(self) -> None:
+        """
+        Treat today's quota as used up, e.g. when the API says so.
+        """
+        self._roll()
+        self.unsaved += max(self.daily_limit - self.spent, 0)
+        self.spent = max(self.spent, self.daily_limit)
+
+    def restore(self, day: str, spent: int) -> None:
+        """
+        Apply a persisted count, if it is for today.
+        """
+        if day == self.day:
+            self.spent = max(self.spent, spent)
+
+
+class CacheStore:
+    """
+    Where a ResponseCache persists its entries and quota ledger.
+    """
+
+    async def load(self, name: str) -> Tuple[List[Entry], Optional[Tuple[str, int]]]:
+        """
+        :return: (entries, most recently used last; (day, units spent) or None)
+        """
+        raise NotImplementedError
+
+    async def save(
+        self,
+        name: str,
+        entries: List[Entry],
+        changed: Iterable[str],
+        removed: Iterable[str],
+        ledger: Optional[QuotaLedger]
+    ) -> None:
+        """
+        :param entries: Every entry, least recently used first
+        :param changed: Keys set since the last save
+        :param removed: Keys evicted since the last save
+        :param ledger: Quota to persist
+        """
+        raise NotImplementedError
+
+
+class FileStore(CacheStore):
+    """
+    One JSON snapshot per cache in `directory`, rewritten on each save.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    async def load(self, name: str) -> Tuple[List[Entry], Optional[Tuple[str, int]]]:
+        def read():
+            path = self._path(name)
+            if not os.path.exists(path):
+                return {}
+            with open(path) as f:
+                return json.load(f)
+
+        data = await asyncio.get_event_loop().run_in_executor(None, read)
+        quota = data.get("quota")
+        entries = [tuple(entry) for entry in data.get("entries", [])]
+        return entries, (quota["day"], quota["spent"]) if quota else None
+
+    async def save(self, name, entries, changed, removed, ledger) -> None:
+        data: Dict[str, Any] = {"entries": entries}
+        if ledger is not None:
+            data["quota"] = {"day": ledger.day, "spent": ledger.spent}
+            ledger.unsaved = 0
+        await asyncio.get_event_loop().run_in_executor(None, atomic_write_json, self._path(name), data)
+
+
+class MongoStore(CacheStore):
+    """
+    Entries as documents in the response_cache collection, written
+    incrementally; a TTL index drops them once too old to serve even
+    stale. Quota spent is added with $inc, so replicas share one count.
+    """
+
+    def __init__(self, stale_for: float):
+        """
+        :param stale_for: Seconds past expiry an entry is kept
+        """
+        self.stale_for = stale_for
+
+    async def load(self, name: str) -> Tuple[List[Entry], Optional[Tuple[str, int]]]:
+        collection = get_database()[COLLECTION]
+        entries = []
+        cursor = collection.find({"cache": name, "key": {"$exists": True}}).sort("fetched_at", ASCENDING)
+        async for doc in cursor:
+            entries.append((doc["key"], doc["value"], doc["fetched_at"], doc["expires_at"]))
+        quota = await collection.find_one(
+            {"cache": name, "day": {"$exists": True}}, sort=[("day", DESCENDING)]
+        )
+        return entries, (quota["day"], quota.get("spent", 0)) if quota else None
+
+    async def save(self, name, entries, changed, removed, ledger) -> None:
+        collection = get_database()[COLLECTION]
+        by_key = {entry[0]: entry for entry in entries}
+        operations = []
+        for key in changed:
+            if key not in by_key:
+                continue
+            _, value, fetched_at, expires_at = by_key[key]
+            operations.append(UpdateOne(
+                {"_id": f"{name}:{key}"},
+                {"$set": {
+                    "cache": name,
+                    "key": key,
+                    "value": value,
+                    "fetched_at": fetched_at,
+                    "expires_at": expires_at,
+                    "purge_at": datetime.utcfromtimestamp(expires_at + self.stale_for),
+                }},
+                upsert=True
+            ))
+        operations.extend(DeleteOne({"_id": f"{name}:{key}"}) for key in removed)
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+
+        if ledger is not None:
+            units, ledger.unsaved = ledger.unsaved, 0
+            try:
+                doc = await collection.find_one_and_update(
+                    {"_id": f"{name}:quota:{ledger.day}"},
+                    {
+                        "$inc": {"spent": units},
+                        "$setOnInsert": {
+                            "cache": name,
+                            "day": ledger.day,
+                            "purge_at": datetime.utcnow() + timedelta(days=2),
+                        },
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except Exception:
+                ledger.unsaved += units
+                raise
+            # Picks up what other replicas spent
+            ledger.restore(ledger.day, doc.get("spent", 0))
+
+
+def new_store() -> Optional[CacheStore]:
+    """
+    The store configured by RESPONSE_CACHE_STORE: file, mongo or none.
+    """
+    kind = Config.RESPONSE_CACHE_STORE
+    if kind == "file":
+        return FileStore(Config.RESPONSE_CACHE_DIR)
+    if kind == "mongo":
+        return MongoStore(Config.RESPONSE_CACHE_STALE)
+    return None
+
+
+class ResponseCache:
+    """
+    Cache of API responses, keyed by endpoint and normalized parameters,
+    with a TTL per endpoint and LRU eviction beyond `maxsize` entries.
+    Expired entries are kept for `stale_for` seconds and served when a
+    fresh response can't be had: the quota is spent or the call failed.
+    Concurrent misses for one key share a single call.
+    Entries and the quota ledger are loaded from `store` on first use and
+    saved every `interval` seconds once something changed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttls: Dict[str, float],
+        maxsize: int = 2000,
+        stale_for: float = 7 * 86400,
+        quota: Optional[QuotaLedger] = None,
+        store: Optional[CacheStore] = None,
+        text_params: Iterable[str] = ("q",),
+        interval: float = 60
+    ):
+        """
+        :param name: Cache name, used by the store
+        :param ttls: Seconds a response stays fresh, per endpoint
+        :param maxsize: Maximum entries, least recently used are evicted first
+        :param stale_for: Seconds past expiry a response may still be served
+        :param quota: Ledger charged for each call made
+        :param store: Persistence, none for memory only
+        :param text_params: Free-text parameters normalized for case and spacing
+        :param interval: Seconds between saves
+        """
+        self.name = name
+        self.ttls = ttls
+        self.maxsize = max(1, maxsize)
+        self.stale_for = stale_for
+        self.quota = quota
+        self.store = store
+        self.text_params = set(text_params)
+        self.interval = interval
+        # key -> (value, fetched_at, expires_at), least recently used first
+        self._data: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._changed: set = set()
+        self._removed: set = set()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.calls = 0
+        self.evictions = 0
+        caches.append(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def make_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """
+        Canonical key: parameters sorted, None dropped, free-text ones
+        lowercased with whitespace collapsed.
+        """
+        normalized = {}
+        for name, value in params.items():
+            if value is None:
+                continue
+            value = str(value)
+            if name in self.text_params:
+                value = " ".join(value.lower().split())
+            normalized[name] = value
+        return f"{endpoint}?{urlencode(sorted(normalized.items()))}"
+
+    def _set(self, key: str, value: Any, fetched_at: float, expires_at: float) -> None:
+        self._data[key] = (value, fetched_at, expires_at)
+        self._data.move_to_end(key)
+        self._changed.add(key)
+        self._removed.discard(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._changed.discard(evicted)
+            self._removed.add(evicted)
+            self.evictions += 1
+
+    def _lookup(self, key: str) -> Tuple[Optional[Tuple[Any, float, float]], bool]:
+        """
+        :return: (entry or None, whether it is fresh)
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None, False
+        now = time.time()
+        if entry[2] + self.stale_for <= now:
+            del self._data[key]
+            self._changed.discard(key)
+            self._removed.add(key)
+            return None, False
+        self._data.move_to_end(key)
+        return entry, entry[2] > now
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if self.store is None:
+                return
+            try:
+                entries, ledger = await self.store.load(self.name)
+            except Exception as e:
+                logger.error(f"Error loading response cache {self.name}: {str(e)}")
+                return
+            # Entries cached since startup are newer than what was saved
+            newer = list(self._data)
+            now = time.time()
+            for key, value, fetched_at, expires_at in entries:
+                if key not in self._data and expires_at + self.stale_for > now:
+                    self._data[key] = (value, fetched_at, expires_at)
+            for key in newer:
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            if ledger is not None and self.quota is not None:
+                self.quota.restore(*ledger)
+            logger.info(f"Response cache {self.name}: {len(entries)} entries restored")
+
+    async def fetch(
+        self,
+        endpoint: str,
+        params: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+        cost: int = 1
+    ) -> Any:
+        """
+        Return the cached response for the call, or make it and cache the result.
+        :param endpoint: Endpoint name, selecting the TTL
+        :param params: Call parameters, without credentials
+        :param call: Coroutine function making the call
+        :param cost: Quota units the call costs
+        :raise QuotaExceeded: Quota spent and nothing cached
+        """
+        await self._ensure_loaded()
+        key = self.make_key(endpoint, params)
+        entry, fresh = self._lookup(key)
+        if fresh:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+
+        future = self._loading.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # The caller making the call was cancelled; take it over
+            entry, fresh = self._lookup(key)
+            if fresh:
+                return entry[0]
+            future = self._loading.get(key)
+
+        if self.quota is not None and not self.quota.try_spend(cost):
+            if entry is not None:
+                self.stale_hits += 1
+                logger.warning(f"{self.name} quota spent, serving a stale response for {key}")
+                return entry[0]
+            raise QuotaExceeded(f"{self.name} daily quota of {self.quota.daily_limit} units spent")
+
+        future = asyncio.get_event_loop().create_future()
+        self._loading[key] = future
+        self.calls += 1
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if entry is not None:
+                self.stale_hits += 1
+                logger.warning(f"{self.name} call failed ({e}), serving a stale response for {key}")
+                future.set_result(entry[0])
+                return entry[0]
+            future.set_exception(e)
+            # Waiters get the exception; don't warn about it being unretrieved
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            now = time.time()
+            self._set(key, value, now, now + self.ttls.get(endpoint, 0))
+            self._start()
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    def _start(self) -> None:
+        if self.store is not None and self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    async def save(self) -> None:
+        """
+        Persist what changed since the last save.
+        """
+        if self.store is None:
+            return
+        ledger_changed = self.quota is not None and self.quota.unsaved
+        if not (self._changed or self._removed or ledger_changed):
+            return
+        changed, self._changed = self._changed, set()
+        removed, self._removed = self._removed, set()
+        entries = [(key, *entry) for key, entry in self._data.items()]
+        try:
+            await self.store.save(self.name, entries, changed, removed, self.quota)
+        except Exception as e:
+            # Retry on the next save
+            self._changed |= {key for key in changed if key in self._data}
+            self._removed |= {key for key in removed if key not in self._data}
+            logger.error(f"Error saving response cache {self.name}: {str(e)}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stale_hits": self.stale_hits,
+            "calls": self.calls,
+            "evictions": self.evictions,
+        }
+        if self.quota is not None:
+            stats["quota_spent"] = self.quota.spent
+            stats["quota_remaining"] = self.quota.remaining()
+        return stats
+
+
+async def save_all() -> None:
+    """
+    Stop every cache's saver and persist what is left.
+    """
+    for cache in caches:
+        await cache.stop()
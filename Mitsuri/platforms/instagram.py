@@ -1,6 +1,6 @@
 import logging
-import requests
 from ..config import Config
+from ..core.http import HTTP_ERRORS, http_client
 
 logger = logging.getLogger("Mitsuri.platforms.Instagram")
 
@@ -18,35 +18,36 @@ class InstagramAPI:
         if not self.access_token:
             raise ValueError("Instagram API access token is missing in the configuration.")
 
-    def get_user_profile(self, user_id: str):
+    async def get_user_profile(self, user_id: str):
         """
         Fetch Instagram user profile information.
         :param user_id: Instagram user ID
         :return: Profile details dictionary
         """
-        url = f"{self.BASE_URL}/{user_id}?fields=id,username,account_type,media_count&access_token={self.access_token}"
+        params = {"fields": "id,username,account_type,media_count", "access_token": self.access_token}
         try:
             logger.info(f"Fetching profile details for user ID: {user_id}")
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return await http_client.get_json(f"{self.BASE_URL}/{user_id}", params=params)
+        except HTTP_ERRORS as e:
             logger.error(f"Instagram API error: {e}")
             return None
 
-    def get_user_media(self, user_id: str, limit: int = 5):
+    async def get_user_media(self, user_id: str, limit: int = 5):
         """
         Fetch recent media for a given Instagram user.
         :param user_id: Instagram user ID
         :param limit: Number of media items to fetch
         :return: List of media details
         """
-        url = f"{self.BASE_URL}/{user_id}/media?fields=id,caption,media_type,media_url,thumbnail_url,timestamp&limit={limit}&access_token={self.access_token}"
+        params = {
+            "fields": "id,caption,media_type,media_url,thumbnail_url,timestamp",
+            "limit": limit,
+            "access_token": self.access_token,
+        }
         try:
             logger.info(f"Fetching media for user ID: {user_id}")
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json().get("data", [])
-        except requests.RequestException as e:
+            data = await http_client.get_json(f"{self.BASE_URL}/{user_id}/media", params=params)
+            return data.get("data", [])
+        except HTTP_ERRORS as e:
             logger.error(f"Instagram API error: {e}")
             return []
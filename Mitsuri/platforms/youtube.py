@@ -1,24 +1,81 @@
 import logging
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from typing import Iterable, Optional
+
 from ..config import Config
+from ..core.http import HTTP_ERRORS, http_client
+from .cache import QuotaExceeded, QuotaLedger, ResponseCache, new_store
 
 logger = logging.getLogger("Mitsuri.platforms.Youtube")
 
+# Quota units per call, as the Data API charges them
+COSTS = {"search": 100, "videos": 1}
+
+# Error reasons meaning the daily quota is spent, rather than e.g. a bad key
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
+# Shared quota ledger and response cache, across every YouTubeAPI instance
+youtube_quota = QuotaLedger(Config.YOUTUBE_DAILY_QUOTA, timezone=Config.YOUTUBE_QUOTA_TIMEZONE)
+youtube_cache = ResponseCache(
+    "youtube",
+    ttls={"search": Config.YOUTUBE_SEARCH_TTL, "videos": Config.YOUTUBE_VIDEO_TTL},
+    maxsize=Config.RESPONSE_CACHE_SIZE,
+    stale_for=Config.RESPONSE_CACHE_STALE,
+    quota=youtube_quota,
+    store=new_store(),
+    text_params=("q",),
+    interval=Config.RESPONSE_CACHE_SAVE_INTERVAL
+)
+
+
+class YouTubeAPIError(Exception):
+    """
+    Error response from the Data API.
+    """
+
+    def __init__(self, code: Optional[int], message: str, reasons: Iterable[str] = ()):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.reasons = set(reasons)
+
 
 class YouTubeAPI:
     """
     YouTube API Integration for Mitsuri Bot.
     Provides utilities to fetch video details, search, and more.
+    Calls the Data API's REST endpoints through the shared HTTP client;
+    responses are cached and calls charged against the daily quota.
     """
 
+    BASE_URL = "https://www.googleapis.com/youtube/v3"
+
     def __init__(self):
         self.api_key = Config.API_KEYS.get("youtube")
         if not self.api_key:
             raise ValueError("YouTube API key is missing in the configuration.")
-        self.youtube = build("youtube", "v3", developerKey=self.api_key)
 
-    def search_videos(self, query: str, max_results: int = 5):
+    async def _get(self, endpoint: str, **params):
+        async def call():
+            try:
+                data = await http_client.get_json(
+                    f"{self.BASE_URL}/{endpoint}",
+                    params={**params, "key": self.api_key},
+                    raise_for_status=False
+                )
+            except ValueError:
+                raise YouTubeAPIError(None, "Response is not JSON")
+            error = data.get("error") if isinstance(data, dict) else None
+            if error:
+                reasons = {item.get("reason") for item in error.get("errors", [])}
+                # 403 also means a bad key, a disabled API and so on; only
+                # these reasons say the day's quota is gone
+                if reasons & QUOTA_REASONS:
+                    youtube_quota.exhaust()
+                raise YouTubeAPIError(error.get("code"), error.get("message", ""), reasons)
+            return data
+
+        return await youtube_cache.fetch(endpoint, params, call, cost=COSTS.get(endpoint, 1))
+
+    async def search_videos(self, query: str, max_results: int = 5):
         """
         Search for videos on YouTube.
         :param query: Search query
@@ -27,10 +84,9 @@ class YouTubeAPI:
         """
         try:
             logger.info(f"Searching YouTube for: {query}")
-            request = self.youtube.search().list(
-                q=query, part="snippet", type="video", maxResults=max_results
+            response = await self._get(
+                "search", q=query, part="snippet", type="video", maxResults=max_results
             )
-            response = request.execute()
             videos = [
                 {
                     "title": item["snippet"]["title"],
@@ -41,11 +97,14 @@ class YouTubeAPI:
                 for item in response.get("items", [])
             ]
             return videos
-        except HttpError as e:
+        except QuotaExceeded as e:
+            logger.warning(f"YouTube search skipped: {e}")
+            return []
+        except (YouTubeAPIError, *HTTP_ERRORS) as e:
             logger.error(f"YouTube API error: {e}")
             return []
 
-    def get_video_details(self, video_id: str):
+    async def get_video_details(self, video_id: str):
         """
         Fetch details of a specific YouTube video.
         :param video_id: ID of the YouTube video
@@ -53,10 +112,9 @@ class YouTubeAPI:
         """
         try:
             logger.info(f"Fetching details for video ID: {video_id}")
-            request = self.youtube.videos().list(
-                id=video_id, part="snippet,statistics,contentDetails"
+            response = await self._get(
+                "videos", id=video_id, part="snippet,statistics,contentDetails"
             )
-            response = request.execute()
             if not response["items"]:
                 return None
             video = response["items"][0]
@@ -68,6 +126,9 @@ class YouTubeAPI:
                 "duration": video["contentDetails"]["duration"],
                 "channel": video["snippet"]["channelTitle"],
             }
-        except HttpError as e:
+        except QuotaExceeded as e:
+            logger.warning(f"YouTube video details skipped: {e}")
+            return None
+        except (YouTubeAPIError, *HTTP_ERRORS) as e:
             logger.error(f"YouTube API error: {e}")
             return None
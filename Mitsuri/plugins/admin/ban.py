@@ -1,6 +1,8 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
 
+from ...core.analytics import group_analytics
+
 
 @Client.on_message(filters.command("ban") & filters.group)
 async def ban_user(client: Client, message: Message):
@@ -18,6 +20,7 @@ async def ban_user(client: Client, message: Message):
     try:
         # Ban the user
         await client.kick_chat_member(chat_id, user_to_ban.id)
+        group_analytics.record_moderation(chat_id, "ban")
         await message.reply_text(f"✅ <b>{user_to_ban.first_name}</b> has been banned from the group.")
     except Exception as e:
         await message.reply_text(f"❌ Failed to ban the user. Error: {e}")
@@ -0,0 +1,73 @@
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from ...config import Config
+from ...utils.formatters import format_time
+
+
+def format_progress(progress: dict) -> str:
+    """
+    Render a broadcast job's progress for the owner.
+    :param progress: BroadcastJob.progress() output
+    """
+    eta = "N/A" if progress["eta"] is None else format_time(int(progress["eta"])) or "0s"
+    return (
+        f"📡 <b>Broadcast</b> <code>{progress['id']}</code> ({progress['status']})\n"
+        f"Progress: {progress['processed']}/{progress['total']}\n"
+        f"✅ Delivered: {progress['delivered']}\n"
+        f"🚫 Blocked: {progress['blocked']}\n"
+        f"👻 Deactivated: {progress['deactivated']}\n"
+        f"❌ Failed: {progress['failed']}\n"
+        f"Rate: {progress['rate']:.1f}/s | ETA: {eta}"
+    )
+
+
+@Client.on_message(filters.command("broadcast") & filters.user(Config.OWNER_ID))
+async def broadcast_command(client: Client, message: Message):
+    """
+    /broadcast command handler.
+    Sends the given text (or the replied-to message's text) to every user.
+    """
+    if message.reply_to_message and message.reply_to_message.text:
+        text = message.reply_to_message.text.html
+    elif len(message.command) >= 2:
+        text = message.text.html.split(maxsplit=1)[1]
+    else:
+        await message.reply_text("❌ Usage: /broadcast <message> or reply to a message with /broadcast")
+        return
+
+    job = await client.broadcast(text)
+    await message.reply_text(
+        f"📡 Broadcast <code>{job.id}</code> started for {job.total} users.\n"
+        "Use /bstatus to follow its progress."
+    )
+
+
+@Client.on_message(filters.command("bstatus") & filters.user(Config.OWNER_ID))
+async def broadcast_status(client: Client, message: Message):
+    """
+    /bstatus command handler.
+    Shows live progress of running broadcasts.
+    """
+    jobs = client.broadcaster.running()
+    if not jobs:
+        await message.reply_text("ℹ️ No broadcast is running.")
+        return
+
+    await message.reply_text("\n\n".join(format_progress(job.progress()) for job in jobs))
+
+
+@Client.on_message(filters.command("bcancel") & filters.user(Config.OWNER_ID))
+async def broadcast_cancel(client: Client, message: Message):
+    """
+    /bcancel command handler.
+    Cancels a running broadcast by its ID.
+    """
+    if len(message.command) < 2:
+        await message.reply_text("❌ Usage: /bcancel <broadcast_id>")
+        return
+
+    if await client.broadcaster.cancel(message.command[1]):
+        await message.reply_text("✅ Broadcast cancelled.")
+    else:
+        await message.reply_text("❌ No running broadcast with that ID.")
@@ -2,6 +2,8 @@ from pyrogram import Client, filters
 from pyrogram.types import Message
 from datetime import timedelta
 
+from ...core.analytics import group_analytics
+
 
 @Client.on_message(filters.command("mute") & filters.group)
 async def mute_user(client: Client, message: Message):
@@ -35,6 +37,7 @@ async def mute_user(client: Client, message: Message):
             permissions={"can_send_messages": False},
             until_date=until_date
         )
+        group_analytics.record_moderation(chat_id, "mute")
         await message.reply_text(f"✅ <b>{user_to_mute.first_name}</b> has been muted for {duration} minutes.")
     except Exception as e:
         await message.reply_text(f"❌ Failed to mute the user. Error: {e}")
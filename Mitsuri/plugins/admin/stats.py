@@ -0,0 +1,74 @@
+import re
+from datetime import timedelta
+from typing import Optional
+
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from ...config import Config
+from ...core.analytics import group_analytics
+from ...core.stats import stats_recorder
+
+UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+DEFAULT_WINDOWS = ("1h", "24h", "7d")
+
+
+def parse_window(value: str) -> Optional[timedelta]:
+    """
+    Parse a window such as 30m, 6h or 7d.
+    :return: The window, or None if invalid
+    """
+    match = re.fullmatch(r"(\d+)([mhd])", value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        return None
+    return timedelta(**{UNITS[match.group(2)]: int(match.group(1))})
+
+
+@Client.on_message(filters.command("stats") & filters.user(Config.OWNER_ID))
+async def stats_command(client: Client, message: Message):
+    """
+    /stats command handler.
+    Shows counters and per-minute rates, over /stats <window> or the default windows.
+    """
+    labels = message.command[1:] or list(DEFAULT_WINDOWS)
+    windows = [(label, parse_window(label)) for label in labels]
+    if any(window is None for _, window in windows):
+        await message.reply_text("❌ Usage: /stats [window ...], e.g. /stats 30m 6h 7d")
+        return
+
+    lines = [f"📊 <b>Statistics</b> (uptime {client.get_uptime()})"]
+    for label, window in windows:
+        rates = await stats_recorder.rates(window)
+        lines.append(f"\n<b>Last {label}</b>")
+        if not rates:
+            lines.append("No activity recorded.")
+        for name, (total, per_minute) in rates.items():
+            lines.append(f"• {name.replace('_', ' ').capitalize()}: {total} ({per_minute:.2f}/min)")
+    await message.reply_text("\n".join(lines))
+
+
+@Client.on_message(filters.command("groupstats") & filters.group)
+async def group_stats_command(client: Client, message: Message):
+    """
+    /groupstats command handler.
+    Shows this group's activity over the last 24h and 7d, or /groupstats <window>.
+    """
+    labels = message.command[1:2] or ["24h", "7d"]
+    windows = [(label, parse_window(label)) for label in labels]
+    if any(window is None for _, window in windows):
+        await message.reply_text("❌ Usage: /groupstats [window], e.g. /groupstats 3d")
+        return
+
+    lines = [f"📈 <b>Activity in {message.chat.title}</b>"]
+    for label, window in windows:
+        summary = await group_analytics.summary(message.chat.id, window)
+        lines.append(f"\n<b>Last {label}</b>")
+        lines.append(f"• Messages: {summary['messages']} ({summary['messages_per_hour']:.1f}/hour)")
+        lines.append(f"• Active users: ~{summary['active_users']}")
+        if summary["commands"]:
+            top = ", ".join(f"/{name} ({count})" for name, count in summary["commands"])
+            lines.append(f"• Top commands: {top}")
+        if summary["moderation"]:
+            actions = ", ".join(f"{name} {count}" for name, count in sorted(summary["moderation"].items()))
+            lines.append(f"• Moderation: {actions}")
+    await message.reply_text("\n".join(lines))
@@ -1,5 +1,24 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+from ..database.settings import EffectiveSettings, settings_for, update_settings_for
+
+
+def _on_off(enabled: bool) -> str:
+    return "✅ Enabled" if enabled else "❌ Disabled"
+
+
+def menu_text(settings: EffectiveSettings) -> str:
+    """
+    Main settings menu, with the settings currently in force.
+    """
+    return (
+        "⚙️ <b>Settings Menu</b> ⚙️\n\n"
+        "Customize your preferences to make Mitsuri work better for you 🌸.\n\n"
+        f"🔔 Notifications: {_on_off(settings.notifications)}\n"
+        f"🎨 Theme: {settings.theme.capitalize()}\n"
+        f"🔒 Privacy mode: {_on_off(settings.privacy)}\n\n"
+        "✨ Use the buttons below to navigate settings options."
+    )
 
 
 @Client.on_message(filters.command("settings") & filters.private)
@@ -9,14 +28,7 @@ async def settings_command(client: Client, message: Message):
     Displays a polished settings menu with interactive buttons for customization.
     """
     # Settings menu text
-    settings_text = (
-        "⚙️ <b>Settings Menu</b> ⚙️\n\n"
-        "Customize your preferences to make Mitsuri work better for you 🌸.\n\n"
-        "🔹 Enable or disable notifications.\n"
-        "🔹 Change themes to match your style.\n"
-        "🔹 Manage privacy settings.\n\n"
-        "✨ Use the buttons below to navigate settings options."
-    )
+    settings_text = menu_text(await settings_for(message))
 
     # Inline keyboard for settings options
     keyboard = InlineKeyboardMarkup([
@@ -39,8 +51,10 @@ async def settings_notifications(client, callback_query):
     Callback query handler for Notifications settings.
     Allows the user to enable or disable notifications.
     """
+    settings = await settings_for(callback_query)
     notifications_text = (
         "🔔 <b>Notification Settings</b> 🔔\n\n"
+        f"Currently: {_on_off(settings.notifications)}\n\n"
         "Manage your notification preferences:\n"
         "🔹 Enable notifications to stay updated.\n"
         "🔹 Disable notifications for a quieter experience.\n\n"
@@ -65,7 +79,7 @@ async def notifications_enable(client, callback_query):
     """
     Callback query handler to enable notifications.
     """
-    # Simulate enabling notifications (logic can be added later)
+    await update_settings_for(callback_query, {"notifications": True})
     await callback_query.answer("✅ Notifications enabled!")
     await settings_notifications(client, callback_query)
 
@@ -75,7 +89,7 @@ async def notifications_disable(client, callback_query):
     """
     Callback query handler to disable notifications.
     """
-    # Simulate disabling notifications (logic can be added later)
+    await update_settings_for(callback_query, {"notifications": False})
     await callback_query.answer("❌ Notifications disabled!")
     await settings_notifications(client, callback_query)
 
@@ -86,8 +100,10 @@ async def settings_themes(client, callback_query):
     Callback query handler for Themes settings.
     Allows the user to select a theme.
     """
+    settings = await settings_for(callback_query)
     themes_text = (
         "🎨 <b>Theme Settings</b> 🎨\n\n"
+        f"Currently: {settings.theme.capitalize()} Theme\n\n"
         "Choose a theme to match your style:\n"
         "🔹 Light Theme - Bright and clear.\n"
         "🔹 Dark Theme - Sleek and easy on the eyes.\n\n"
@@ -112,7 +128,7 @@ async def theme_light(client, callback_query):
     """
     Callback query handler to set the Light Theme.
     """
-    # Simulate setting the Light Theme (logic can be added later)
+    await update_settings_for(callback_query, {"theme": "light"})
     await callback_query.answer("🌞 Light Theme activated!")
     await settings_themes(client, callback_query)
 
@@ -122,7 +138,7 @@ async def theme_dark(client, callback_query):
     """
     Callback query handler to set the Dark Theme.
     """
-    # Simulate setting the Dark Theme (logic can be added later)
+    await update_settings_for(callback_query, {"theme": "dark"})
     await callback_query.answer("🌑 Dark Theme activated!")
     await settings_themes(client, callback_query)
 
@@ -133,8 +149,10 @@ async def settings_privacy(client, callback_query):
     Callback query handler for Privacy settings.
     Displays privacy options for the user to manage.
     """
+    settings = await settings_for(callback_query)
     privacy_text = (
         "🔒 <b>Privacy Settings</b> 🔒\n\n"
+        f"Currently: {_on_off(settings.privacy)}\n\n"
         "Manage your privacy settings:\n"
         "🔹 Enable privacy mode to hide your activity.\n"
         "🔹 Disable privacy mode to allow more features.\n\n"
@@ -159,7 +177,7 @@ async def privacy_enable(client, callback_query):
     """
     Callback query handler to enable privacy mode.
     """
-    # Simulate enabling privacy mode (logic can be added later)
+    await update_settings_for(callback_query, {"privacy": True})
     await callback_query.answer("🔐 Privacy mode enabled!")
     await settings_privacy(client, callback_query)
 
@@ -169,7 +187,7 @@ async def privacy_disable(client, callback_query):
     """
     Callback query handler to disable privacy mode.
     """
-    # Simulate disabling privacy mode (logic can be added later)
+    await update_settings_for(callback_query, {"privacy": False})
     await callback_query.answer("⚪ Privacy mode disabled!")
     await settings_privacy(client, callback_query)
 
@@ -179,14 +197,7 @@ async def settings_menu(client, callback_query):
     """
     Callback query handler to return to the main Settings menu.
     """
-    settings_text = (
-        "⚙️ <b>Settings Menu</b> ⚙️\n\n"
-        "Customize your preferences to make Mitsuri work better for you 🌸.\n\n"
-        "🔹 Enable or disable notifications.\n"
-        "🔹 Change themes to match your style.\n"
-        "🔹 Manage privacy settings.\n\n"
-        "✨ Use the buttons below to navigate settings options."
-    )
+    settings_text = menu_text(await settings_for(callback_query))
 
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("🔔 Notifications", callback_data="settings_notifications")],
@@ -1,7 +1,7 @@
-import requests
 from pyrogram import Client, filters
 from pyrogram.types import Message
-from ..config import Config
+from ...config import Config
+from ...core.http import http_client
 
 
 @Client.on_message(filters.command("weather") & filters.private)
@@ -19,17 +19,17 @@ async def get_weather(client: Client, message: Message):
 
     city_name = " ".join(message.command[1:])
     api_key = Config.API_KEYS.get("openweather")
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
+    base_url = "https://api.openweathermap.org/data/2.5/weather"
 
     try:
-        response = requests.get(base_url, params={
+        # Errors come back as JSON too, with the status in "cod"
+        data = await http_client.get_json(base_url, params={
             "q": city_name,
             "appid": api_key,
             "units": "metric"
-        })
-        data = response.json()
+        }, raise_for_status=False)
 
-        if data["cod"] != 200:
+        if int(data["cod"]) != 200:
             await message.reply_text(f"❌ Error: {data['message']}")
             return
 
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncTTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire after a TTL, for
+    values loaded by coroutines.
+    `get_or_load` is single-flight: concurrent misses for one key share a
+    single load. A loaded None is cached too (for `negative_ttl`), so keys
+    with no backing document don't cause a query each time.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, negative_ttl: Optional[float] = None):
+        """
+        :param maxsize: Maximum entries, least recently used are evicted first
+        :param ttl: Seconds an entry stays valid
+        :param negative_ttl: Seconds a cached None stays valid, `ttl` by default
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Bumped by every invalidation, so batch loaders can tell if
+        # what they read may already be stale
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        value, expires = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Cached value for a key, without loading.
+        """
+        found, value = self._lookup(key)
+        if not found:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ttl = self.negative_ttl if value is None else self.ttl
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value, or load, cache and return it.
+        :param key: Cache key
+        :param loader: Coroutine function producing the value on a miss
+        """
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        future = self._loading.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # The caller loading it was cancelled; take over the load
+            found, value = self._lookup(key)
+            if found:
+                return value
+            future = self._loading.get(key)
+
+        future = asyncio.get_event_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters get the exception; don't warn about it being unretrieved
+            future.exception()
+            raise
+        else:
+            # An invalidation during the load means the value may be stale
+            if self._loading.get(key) is future:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop a key, including a load in progress for it.
+        """
+        self._data.pop(key, None)
+        self._loading.pop(key, None)
+        self.generation += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._loading.clear()
+        self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,33 @@
+import re
+from typing import Optional
+
+from pyrogram.types import Message
+
+from ..config import Config
+
+# A configured prefix directly followed by the command name, e.g. "/start@MitsuriBot"
+COMMAND_PATTERN = re.compile(
+    "^(?:{})(\\w+)(?:@\\w+)?(?:\\s|$)".format(
+        "|".join(re.escape(prefix) for prefix in sorted(Config.COMMAND_PREFIXES, key=len, reverse=True))
+    )
+)
+
+
+def command_name(message: Message) -> Optional[str]:
+    """
+    Name of the command a message invokes, without prefix or @botname.
+    Text like "..." or "!!!" is not a command: a prefix must be followed
+    by a word character.
+    :param message: Incoming message
+    :return: Lowercase command name, or None if not a command
+    """
+    match = COMMAND_PATTERN.match(message.text or "")
+    return match.group(1).lower() if match else None
+
+
+def is_command(message: Message) -> bool:
+    """
+    Check if a message invokes a bot command.
+    :param message: Incoming message
+    """
+    return command_name(message) is not None
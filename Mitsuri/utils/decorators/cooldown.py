@@ -1,30 +1,33 @@
 from functools import wraps
-from time import time
+from math import ceil
 from pyrogram.types import Message
 
-cooldown_cache = {}
+from ...core.cooldowns import cooldowns
 
 
-def cooldown(seconds: int):
+def cooldown(seconds: int, scope: str = "user"):
     """
     Decorator to rate-limit commands.
     :param seconds: Cooldown duration in seconds
+    :param scope: user, chat, user_chat or global (see core.cooldowns.make_key)
     """
 
     def decorator(func):
         @wraps(func)
         async def wrapper(client, message: Message, *args, **kwargs):
-            user_id = message.from_user.id
-            current_time = time()
+            command = message.command[0] if message.command else func.__name__
+            remaining = await cooldowns.check(
+                command,
+                seconds,
+                user_id=message.from_user.id if message.from_user else 0,
+                chat_id=message.chat.id,
+                scope=scope
+            )
+
+            if remaining:
+                await message.reply_text(f"⏳ Please wait {ceil(remaining)}s before using this command again.")
+                return
 
-            if user_id in cooldown_cache:
-                last_used = cooldown_cache[user_id]
-                if current_time - last_used < seconds:
-                    remaining = seconds - (current_time - last_used)
-                    await message.reply_text(f"⏳ Please wait {int(remaining)}s before using this command again.")
-                    return
-
-            cooldown_cache[user_id] = current_time
             return await func(client, message, *args, **kwargs)
 
         return wrapper
@@ -1,4 +1,8 @@
 from datetime import datetime, timedelta
+from typing import List
+
+# Telegram's limit for a single text message
+MAX_MESSAGE_LENGTH = 4096
 
 
 def format_time(seconds: int) -> str:
@@ -42,3 +46,28 @@ def truncate_text(text: str, max_length: int = 100) -> str:
     :return: Truncated text
     """
     return text if len(text) <= max_length else f"{text[:max_length]}..."
+
+
+def split_text(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split text into chunks that fit in one message, preferring line breaks,
+    then spaces, and only cutting words when there is no other boundary.
+    :param text: Original text
+    :param limit: Maximum length of a chunk
+    :return: List of chunks
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            # No boundary at all, hard cut
+            chunks.append(text[:limit])
+            text = text[limit:]
+            continue
+        # Drop the separator itself
+        chunks.append(text[:cut])
+        text = text[cut + 1:]
+    chunks.append(text)
+    return chunks
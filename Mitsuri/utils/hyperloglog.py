@@ -0,0 +1,89 @@
+import math
+from typing import Dict, Iterable, Optional
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(value: int) -> int:
+    """
+    splitmix64 finalizer: spreads sequential IDs over all 64 bits.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch over integer IDs. Uses 2**precision one-byte
+    registers whatever the number of IDs added; the standard error is
+    about 1.04 / sqrt(2**precision), ~3% at the default precision of 10.
+    Sketches merge by taking the maximum of each register, which is what
+    lets them be stored sparsely and combined with MongoDB's $max.
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 10, registers: Optional[Dict[int, int]] = None):
+        """
+        :param precision: Index bits, 4 to 16
+        :param registers: Sparse non-zero registers to start from
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        if registers:
+            self.merge_registers(registers)
+
+    def add(self, value: int) -> Optional[int]:
+        """
+        Add an ID.
+        :return: Index of the register this raised, or None if none changed
+        """
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        # Position of the first set bit in the remaining bits, 1-based
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return index
+        return None
+
+    def merge_registers(self, registers: Dict[int, int]) -> None:
+        """
+        Merge sparse registers, as stored by `sparse`.
+        """
+        for index, rank in registers.items():
+            index = int(index)
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def sparse(self, indexes: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """
+        Non-zero registers keyed by index string, ready for a MongoDB document.
+        :param indexes: Only these registers
+        """
+        if indexes is None:
+            indexes = range(len(self.registers))
+        return {str(index): self.registers[index] for index in indexes if self.registers[index]}
+
+    def count(self) -> int:
+        """
+        Estimated number of distinct IDs added.
+        """
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,85 @@
+import time
+from typing import Dict, Hashable, Optional, Set
+
+SCOPES = ("user", "chat", "user_chat")
+
+
+class RateLimiter:
+    """
+    GCRA rate limiter allowing `limit` events per `window` seconds per key.
+    A key's whole state is one float, its theoretical arrival time (TAT).
+    Once the TAT is in the past the key is indistinguishable from a new
+    one, so keys are filed in a wheel of one-second slots by the time
+    their TAT passes and dropped when time sweeps over their slot. Memory
+    therefore follows currently active keys only.
+    """
+
+    def __init__(self, limit: int, window: float, scope: str = "user"):
+        """
+        :param limit: Events allowed per window
+        :param window: Window length in seconds
+        :param scope: What events are counted per: user, chat or user_chat
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown rate limit scope: {scope}")
+        self.limit = max(1, limit)
+        self.window = window
+        self.scope = scope
+        self._interval = window / self.limit
+        self._tat: Dict[Hashable, float] = {}
+        self._wheel: Dict[int, Set[Hashable]] = {}
+        self._swept = int(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def key_for(self, user_id: int, chat_id: int) -> Hashable:
+        """
+        Build the key an event is counted under for this limiter's scope.
+        """
+        if self.scope == "user":
+            return user_id
+        if self.scope == "chat":
+            return chat_id
+        return user_id, chat_id
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> float:
+        """
+        Record an event for a key if the limit allows it.
+        :param key: Key from `key_for`
+        :param now: Current monotonic time
+        :return: 0 if allowed, otherwise seconds until the next event is
+        """
+        now = time.monotonic() if now is None else now
+        self._sweep(now)
+
+        old_tat = self._tat.get(key)
+        tat = now if old_tat is None or old_tat < now else old_tat
+        new_tat = tat + self._interval
+        if new_tat - now > self.window:
+            return new_tat - self.window - now
+
+        if old_tat is not None:
+            slot = self._wheel.get(int(old_tat) + 1)
+            if slot is not None:
+                slot.discard(key)
+        self._tat[key] = new_tat
+        self._wheel.setdefault(int(new_tat) + 1, set()).add(key)
+        return 0.0
+
+    def _sweep(self, now: float) -> None:
+        """
+        Forget keys whose TAT has passed.
+        """
+        current = int(now)
+        if current <= self._swept:
+            return
+        if current - self._swept > len(self._wheel):
+            # Idle for long, cheaper to look at the occupied slots only
+            due = [slot for slot in self._wheel if slot <= current]
+        else:
+            due = range(self._swept + 1, current + 1)
+        for slot in due:
+            for key in self._wheel.pop(slot, ()):
+                del self._tat[key]
+        self._swept = current
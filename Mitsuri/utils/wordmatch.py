@@ -0,0 +1,102 @@
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def fold(text: str) -> str:
+    """
+    Normalize text for matching: NFKC (so lookalike forms such as
+    full-width letters compare equal) then case folding.
+    :param text: Original text
+    :return: Folded text
+    """
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class WordMatcher:
+    """
+    Aho-Corasick automaton matching many words in one pass over the text.
+    Built once from a word list; instances are immutable, so a rebuilt
+    matcher can be swapped in by plain reference assignment.
+    """
+
+    __slots__ = ("words", "whole_words", "_goto", "_fail", "_out")
+
+    def __init__(self, words: Iterable[str], whole_words: bool = False):
+        """
+        :param words: Words to match
+        :param whole_words: Only match words not embedded in a longer word
+        """
+        self.words: List[str] = sorted({fold(word) for word in words if word and word.strip()})
+        self.whole_words = whole_words
+        # State 0 is the root. Per state: transitions, failure link and
+        # the indexes of the words ending there (including via failure links)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for index, word in enumerate(self.words):
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def __bool__(self) -> bool:
+        return bool(self.words)
+
+    def finditer(self, folded: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        Yield every match in already folded text.
+        :param folded: Text passed through `fold`
+        :return: Iterator of (start, end, word)
+        """
+        goto, fail, out, words = self._goto, self._fail, self._out, self.words
+        length = len(folded)
+        state = 0
+        for position, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                word = words[index]
+                end = position + 1
+                start = end - len(word)
+                if self.whole_words and (
+                    (start > 0 and _is_word_char(folded[start - 1]))
+                    or (end < length and _is_word_char(folded[end]))
+                ):
+                    continue
+                yield start, end, word
+
+    def search(self, folded: str) -> Optional[str]:
+        """
+        Return the first word found in already folded text, if any.
+        :param folded: Text passed through `fold`
+        """
+        if not self.words:
+            return None
+        for _, _, word in self.finditer(folded):
+            return word
+        return None
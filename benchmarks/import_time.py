@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Import-time budget for the Mitsuri package.
+
+Every Mitsuri module is imported on its own in a fresh interpreter,
+which reports:
+- self and cumulative import time, from `python -X importtime`, as the
+  median of --repeat runs;
+- memory allocated while importing, from tracemalloc. Self memory is
+  allocated by the module's own file; cumulative memory is everything
+  the import allocated.
+
+The results are checked against a budget file. The run fails when a
+module exceeds its budget or can't be imported.
+
+Third-party packages are replaced by stubs and outgoing connections
+are refused. The numbers then cover Mitsuri's own code, don't depend on
+what is installed, and can be measured offline on any Linux box.
+
+    python benchmarks/import_time.py                  # check against the budget
+    python benchmarks/import_time.py --update         # rewrite the budget from this run
+    python benchmarks/import_time.py Mitsuri.config   # only some modules
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "Mitsuri"
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+MARKER = "-- measured import --"
+
+# Third-party packages Mitsuri imports, replaced by stubs in the child interpreter
+STUBBED = (
+    "aiohttp", "bson", "dotenv", "googleapiclient", "googletrans", "motor",
+    "pymongo", "pyrogram", "pytz", "requests", "tgcrypto", "tweepy",
+)
+
+# Run in the child interpreter before the measured import. Stub modules
+# resolve any attribute to a class that can be called, subclassed, used as
+# a decorator or an exception, and combined with & | ~ like filters.
+BOOTSTRAP = r'''
+import importlib.abc, importlib.machinery, json, socket, sys, tracemalloc, types
+
+STUBBED = set(%(stubbed)r)
+
+class _StubMeta(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _stub_class(name)
+    def __and__(cls, other):
+        return _Stub()
+    __or__ = __rand__ = __ror__ = __and__
+    def __invert__(cls):
+        return _Stub()
+
+class _Stub(Exception, metaclass=_StubMeta):
+    def __new__(cls, *args, **kwargs):
+        return Exception.__new__(cls)
+    def __init__(self, *args, **kwargs):
+        pass
+    def __call__(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs and callable(args[0]):
+            return args[0]
+        return _Stub()
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Stub()
+    def __and__(self, other):
+        return _Stub()
+    __or__ = __rand__ = __ror__ = __and__
+    def __invert__(self):
+        return _Stub()
+    def __iter__(self):
+        return iter(())
+
+def _stub_class(name):
+    return _StubMeta(name, (_Stub,), {})
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _stub_class(name)
+        setattr(self, name, value)
+        return value
+
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in STUBBED:
+            return importlib.machinery.ModuleSpec(name, self, is_package=True)
+        return None
+    def create_module(self, spec):
+        module = _StubModule(spec.name)
+        module.__path__ = []
+        return module
+    def exec_module(self, module):
+        pass
+
+if STUBBED:
+    sys.meta_path.insert(0, _StubFinder())
+
+def _refuse(*args, **kwargs):
+    raise ConnectionRefusedError("network access is disabled while measuring imports")
+
+socket.socket.connect = _refuse
+socket.socket.connect_ex = _refuse
+socket.create_connection = _refuse
+
+sys.path.insert(0, %(root)r)
+module = %(module)r
+# Everything -X importtime reports after this line is the measured import
+sys.stderr.write(%(marker)r + "\n")
+sys.stderr.flush()
+# The import statement's path, which -X importtime instruments; importlib.import_module isn't
+if %(memory)r:
+    tracemalloc.start()
+    __import__(module)
+    total = tracemalloc.get_traced_memory()[0]
+    spec = sys.modules[module].__spec__
+    own = 0
+    if spec is not None and spec.origin:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, spec.origin)]
+        )
+        own = sum(stat.size for stat in snapshot.statistics("filename"))
+    tracemalloc.stop()
+    print(json.dumps({"self_kb": own / 1024, "cumulative_kb": total / 1024}))
+else:
+    __import__(module)
+'''
+
+
+def discover_modules(root: str = ROOT, package: str = PACKAGE) -> List[str]:
+    """
+    Every module of the package, found on disk without importing it.
+    """
+    modules = []
+    base = os.path.join(root, package)
+    for directory, subdirectories, files in os.walk(base):
+        subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__" and not d.startswith("."))
+        if "__init__.py" not in files:
+            subdirectories[:] = []
+            continue
+        relative = os.path.relpath(directory, root)
+        dotted = relative.replace(os.sep, ".")
+        modules.append(dotted)
+        for file in sorted(files):
+            if file.endswith(".py") and file != "__init__.py":
+                modules.append(f"{dotted}.{file[:-3]}")
+    return modules
+
+
+def _child(module: str, memory: bool, stubs: bool, cwd: str) -> subprocess.CompletedProcess:
+    code = BOOTSTRAP % {
+        "stubbed": STUBBED if stubs else (),
+        "root": ROOT,
+        "module": module,
+        "memory": memory,
+        "marker": MARKER,
+    }
+    command = [sys.executable, "-I", "-c", code]
+    if not memory:
+        command[1:1] = ["-X", "importtime"]
+    return subprocess.run(command, cwd=cwd, capture_output=True, text=True, timeout=120)
+
+
+def _parse_importtime(stderr: str, module: str) -> Optional[Dict[str, float]]:
+    """
+    Milliseconds from -X importtime output: `self_ms` spent in the module's
+    own body, `cumulative_ms` the whole cold import, i.e. the module with
+    its parent packages and everything they pulled in.
+    """
+    lines = stderr.splitlines()
+    if MARKER not in lines:
+        return None
+    own = None
+    total = 0
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        name = fields[2][1:]
+        if not name.startswith(" "):
+            # Top-level import of the measured statement
+            total += cumulative_us
+        if name.strip() == module and own is None:
+            # Children are reported before their parents, so the first line
+            # is where the module body ran; a later top-level line for the
+            # same name only covers importing its parent packages first
+            own = self_us
+    if own is None:
+        return None
+    return {"self_ms": own / 1000, "cumulative_ms": total / 1000}
+
+
+def _error(result: subprocess.CompletedProcess) -> str:
+    lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+    return lines[-1] if lines else f"exit status {result.returncode}"
+
+
+def measure(module: str, repeat: int = 5, stubs: bool = True) -> Dict[str, Any]:
+    """
+    Import `module` in fresh interpreters and measure it.
+    :param module: Dotted module name
+    :param repeat: Timed runs, the median is kept
+    :param stubs: Replace third-party packages by stubs
+    :return: self_ms, cumulative_ms, self_kb, cumulative_kb, or error
+    """
+    # Run outside the checkout so nothing an import writes lands in it
+    with tempfile.TemporaryDirectory(prefix="mitsuri-import-") as cwd:
+        timings = []
+        for _ in range(repeat):
+            result = _child(module, False, stubs, cwd)
+            if result.returncode != 0:
+                return {"error": _error(result)}
+            timing = _parse_importtime(result.stderr, module)
+            if timing is None:
+                return {"error": "module missing from -X importtime output"}
+            timings.append(timing)
+
+        result = _child(module, True, stubs, cwd)
+        if result.returncode != 0:
+            return {"error": _error(result)}
+        memory = json.loads(result.stdout.strip().splitlines()[-1])
+
+    return {
+        "self_ms": statistics.median(timing["self_ms"] for timing in timings),
+        "cumulative_ms": statistics.median(timing["cumulative_ms"] for timing in timings),
+        **memory,
+    }
+
+
+def check(results: Dict[str, Dict[str, Any]], budget: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    Compare measurements with the budget.
+    :return: One line per failure
+    """
+    failures = []
+    for module, result in results.items():
+        if "error" in result:
+            failures.append(f"{module}: import failed: {result['error']}")
+            continue
+        for metric, limit in budget.get(module, {}).items():
+            if metric in result and result[metric] > limit:
+                failures.append(f"{module}: {metric} {result[metric]:.1f} over budget {limit:.1f}")
+    return failures
+
+
+def make_budget(
+    results: Dict[str, Dict[str, Any]],
+    time_headroom: float,
+    memory_headroom: float
+) -> Dict[str, Dict[str, float]]:
+    """
+    Budget allowing each module `headroom` times what it measured.
+    Time varies more between machines than memory, so it gets more room.
+    """
+    budget = {}
+    for module, result in sorted(results.items()):
+        if "error" in result:
+            continue
+        budget[module] = {
+            "self_ms": round(max(result["self_ms"] * time_headroom, 5.0), 1),
+            "cumulative_ms": round(max(result["cumulative_ms"] * time_headroom, 10.0), 1),
+            "self_kb": round(max(result["self_kb"] * memory_headroom, 16.0), 1),
+            "cumulative_kb": round(max(result["cumulative_kb"] * memory_headroom, 16.0), 1),
+        }
+    return budget
+
+
+def _table(results: Dict[str, Dict[str, Any]], budget: Dict[str, Dict[str, float]]) -> str:
+    width = max([len(module) for module in results] + [6])
+    lines = [
+        f"{'module':<{width}}  {'self ms':>8}  {'cum ms':>8}  {'budget':>8}  "
+        f"{'self KiB':>9}  {'cum KiB':>9}  {'budget':>9}"
+    ]
+    for module, result in results.items():
+        if "error" in result:
+            lines.append(f"{module:<{width}}  error: {result['error']}")
+            continue
+        limits = budget.get(module, {})
+        time_limit = f"{limits['cumulative_ms']:.1f}" if "cumulative_ms" in limits else "-"
+        memory_limit = f"{limits['cumulative_kb']:.1f}" if "cumulative_kb" in limits else "-"
+        lines.append(
+            f"{module:<{width}}  {result['self_ms']:>8.1f}  {result['cumulative_ms']:>8.1f}  {time_limit:>8}  "
+            f"{result['self_kb']:>9.1f}  {result['cumulative_kb']:>9.1f}  {memory_limit:>9}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure Mitsuri import time and memory against a budget")
+    parser.add_argument("modules", nargs="*", help="Modules to measure, all by default")
+    parser.add_argument("--budget", default=BUDGET_FILE, help="Budget file")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed imports per module")
+    parser.add_argument("--update", action="store_true", help="Write the budget from this run instead of checking")
+    parser.add_argument("--time-headroom", type=float, default=3.0, help="Budget / measured time with --update")
+    parser.add_argument("--memory-headroom", type=float, default=1.5, help="Budget / measured memory with --update")
+    parser.add_argument("--jobs", type=int, default=1, help="Modules measured in parallel; more is faster but noisier")
+    parser.add_argument("--real-deps", action="store_true", help="Import installed third-party packages")
+    parser.add_argument("--json", action="store_true", help="Print the measurements as JSON")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or discover_modules()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        measured = pool.map(lambda module: measure(module, args.repeat, not args.real_deps), modules)
+        results = dict(zip(modules, measured))
+
+    budget: Dict[str, Dict[str, float]] = {}
+    if os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budget = json.load(f).get("modules", {})
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        print(_table(results, budget))
+
+    if args.update:
+        if not args.modules:
+            budget = {}
+        budget.update(make_budget(results, args.time_headroom, args.memory_headroom))
+        with open(args.budget, "w") as f:
+            json.dump({"python": f"{sys.version_info[0]}.{sys.version_info[1]}", "modules": budget}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBudget written to {args.budget}")
+
+    failures = check(results, {} if args.update else budget)
+    unbudgeted = [module for module in results if module not in budget and "error" not in results[module]]
+    if unbudgeted and not args.update:
+        print(f"\nNo budget for: {', '.join(unbudgeted)}")
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
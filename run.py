@@ -4,31 +4,16 @@
 import os
 import asyncio
 import logging
-from logging.handlers import RotatingFileHandler
+import signal
 import time
 import sys
 
-# Setup logging configuration
-logging.basicConfig(
-    format="[%(asctime)s - %(levelname)s] - %(name)s - %(message)s",
-    datefmt="%d-%b-%y %H:%M:%S",
-    level=logging.INFO,
-    handlers=[
-        RotatingFileHandler(
-            "logs/mitsuri.log", maxBytes=5000000, backupCount=10
-        ),
-        logging.StreamHandler(),
-    ],
-)
+from Mitsuri.core.logger import setup_logging
 
-logging.getLogger("pyrogram").setLevel(logging.WARNING)
-logging.getLogger("motor").setLevel(logging.WARNING)
+# Setup logging configuration; file and console writes happen on a background thread
+log_pipeline = setup_logging("logs/mitsuri.log")
 LOGGER = logging.getLogger("Mitsuri")
 
-# Ensure log directory exists
-if not os.path.exists("logs"):
-    os.makedirs("logs")
-
 # Fancy banner
 def show_banner():
     banner = """
@@ -61,18 +46,29 @@ if missing_env:
 show_banner()
 
 if __name__ == "__main__":
-    from Mitsuri import initialize_app
+    from Mitsuri import initialize_app, shutdown_app
     
     loop = asyncio.get_event_loop()
     LOGGER.info("Starting Mitsuri Bot...")
     
+    try:
+        # Stop on SIGTERM as on Ctrl+C, so shutdown saves buffered data
+        loop.add_signal_handler(signal.SIGTERM, loop.stop)
+    except (NotImplementedError, AttributeError):
+        pass  # Not supported on Windows
+    
     try:
         loop.run_until_complete(initialize_app())
         LOGGER.info("Bot startup complete!")
         loop.run_forever()
     except KeyboardInterrupt:
-        LOGGER.info("Stopping Mitsuri Bot...")
-        loop.run_until_complete(asyncio.sleep(0.3))  # Small delay to ensure clean shutdown
+        pass
     finally:
+        LOGGER.info("Stopping Mitsuri Bot...")
+        try:
+            loop.run_until_complete(shutdown_app())
+        except Exception as e:
+            LOGGER.error(f"Error during shutdown: {str(e)}", exc_info=True)
         loop.close()
         LOGGER.info("Mitsuri Bot stopped successfully.")
+        log_pipeline.stop()